@@ -9,8 +9,11 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
+import logging
 import os
+import threading
 import yaml
+from docutils.parsers.rst import directives, roles
 from flask import Flask as _Flask, render_template, request
 from flask.ctx import _app_ctx_stack
 from flask.helpers import locked_cached_property
@@ -18,8 +21,9 @@ from flask_babel import Babel
 from jinja2.loaders import ChoiceLoader
 
 # import blohg stuff
+from blohg.cache import render_cache, RenderStore, RENDER_STORE_FILE
 from blohg.ext import ExtensionImporter
-from blohg.models import Blog
+from blohg.models import Blog, extension_directives, extension_roles
 from blohg.signals import reloaded
 from blohg.static import BlohgStaticFile
 from blohg.templating import BlohgLoader
@@ -30,6 +34,22 @@ from blohg.views import views
 
 class Flask(_Flask):
 
+    @property
+    def config(self):
+        # the configuration loaded from the repository is published by blohg
+        # with the content, and each app context keeps using the one it saw
+        # first, like the content.
+        blohg = self.__dict__.get('blohg')
+        if blohg is not None:
+            config = blohg._get_snapshot()[2]
+            if config is not None:
+                return config
+        return self._config
+
+    @config.setter
+    def config(self, value):
+        self._config = value
+
     @locked_cached_property
     def jinja_loader(self):
         if self.template_folder is not None:
@@ -39,13 +59,34 @@ class Flask(_Flask):
 
 class Blohg(object):
 
-    def __init__(self, app, embedded_extensions=False):
+    def __init__(self, app, embedded_extensions=False, reload_interval=None):
         self.app = app
         self.embedded_extensions = embedded_extensions
-        self.changectx = None
-        self.content = []
+        self.reload_interval = reload_interval
+        # the change context, the content and the configuration are replaced
+        # together, and each app context keeps using the ones it saw first,
+        # even if the repository is reloaded by another thread.
+        self._snapshot = (None, [], None)
+        self._reload_lock = threading.Lock()
+        self._reloader = None
         app.blohg = self
 
+    def _get_snapshot(self):
+        ctx = _app_ctx_stack.top
+        if ctx is None or ctx.app is not self.app:
+            return self._snapshot
+        if not hasattr(ctx.g, 'blohg_snapshot'):
+            ctx.g.blohg_snapshot = self._snapshot
+        return ctx.g.blohg_snapshot
+
+    @property
+    def changectx(self):
+        return self._get_snapshot()[0]
+
+    @property
+    def content(self):
+        return self._get_snapshot()[1]
+
     @locked_cached_property
     def repo(self):
         if not os.path.isdir(self.app.config['REPO_PATH']):
@@ -58,11 +99,12 @@ class Blohg(object):
             raise RuntimeError('Repository not found: %s' % \
                                self.app.config['REPO_PATH'])
         self.revision_id = revision_id
-        self.reload()
-        self.load_extensions()
+        self.reload(warm=True, extensions=True)
+        if self.reload_interval is not None:
+            self.start_reloader(self.reload_interval)
 
-    def _load_config(self):
-        config = yaml.load(self.changectx.get_filectx('config.yaml').content,
+    def _load_config(self, changectx, old_config):
+        config = yaml.load(changectx.get_filectx('config.yaml').content,
                            Loader=yaml.SafeLoader)
 
         # monkey-patch configs when running from built-in server
@@ -71,49 +113,188 @@ class Blohg(object):
                 del config['GOOGLE_ANALYTICS']
             config['DISQUS_DEVELOPER'] = True
 
-        self.app.config.update(config)
-
-    def reload(self):
+        # the new configuration is built aside, and published with the
+        # content.
+        rv = self.app.config_class(old_config.root_path, old_config)
+        rv.update(config)
+        return rv
+
+    def _setup_render_store(self, config):
+        render_cache.max_size = config['RENDER_CACHE_SIZE']
+        # renderings are persisted only if a cache directory is configured.
+        if config['CACHE_DIR'] is None:
+            render_cache.store = None
+            return
+        filename = os.path.join(config['REPO_PATH'], config['CACHE_DIR'],
+                                RENDER_STORE_FILE)
+        store = render_cache.store
+        if store is None or store.filename != filename or \
+           store.max_size != config['CACHE_SIZE']:
+            render_cache.store = RenderStore(filename, config['CACHE_SIZE'])
+
+    def reload(self, warm=False, extensions=False):
+        """Reloads the repository, if needed. The new change context, content
+        and configuration are built aside, and then replace the old ones at
+        once.
+
+        :param warm: if ``True``, the metadata of all the pages/posts is
+                     evaluated before replacing the old content, and the
+                     pages/posts are rendered, if ``WARMUP`` is enabled.
+                     Reloads done outside of the requests, at startup or by
+                     the background reloader, should be warm.
+        :param extensions: if ``True``, the extensions are loaded from the new
+                           change context, before the content is built, so
+                           the pages/posts see their directives and roles.
+        """
 
         # if called from the initrepo script command the repository will not
         # exists, then it shouldn't be loaded
         if not os.path.exists(self.app.config['REPO_PATH']):
             return
 
-        if self.changectx is not None and not self.changectx.needs_reload():
-            return
-
-        self.changectx = self.repo.get_changectx(self.revision_id)
-        self._load_config()
-
-        # build a regular expression for search posts/pages.
-        content_dir = self.app.config['CONTENT_DIR']
-        post_ext = self.app.config['POST_EXT']
-        rst_header_level = self.app.config['RST_HEADER_LEVEL']
-
-        self.content = Blog(self.changectx, content_dir, post_ext,
-                            rst_header_level)
+        with self._reload_lock:
+            old_changectx, old_content, old_config = self._snapshot
+            if old_changectx is not None and \
+               not old_changectx.needs_reload():
+                return
+
+            changectx = self.repo.get_changectx(self.revision_id)
+            config = self._load_config(changectx,
+                                       old_config or self.app._config)
+            self._setup_render_store(config)
+            if extensions:
+                self.load_extensions(changectx, config)
+
+            # build a regular expression for search posts/pages.
+            content_dir = config['CONTENT_DIR']
+            post_ext = config['POST_EXT']
+            rst_header_level = config['RST_HEADER_LEVEL']
+
+            # pages/posts whose files didn't change are reused, if possible.
+            previous = old_content if isinstance(old_content, Blog) else None
+            content = Blog(changectx, content_dir, post_ext,
+                           rst_header_level, previous,
+                           config['LEAN_CONTENT'])
+            self.app.logger.debug('Content files loaded in %.3f seconds',
+                                  content.load_time)
+            if self.app.logger.isEnabledFor(logging.DEBUG) and content._all:
+                self.app.logger.debug('Content uses %i bytes per page/post',
+                                      content.memory_usage() /
+                                      len(content._all))
+            self.app.logger.debug('Render cache: %i bytes, %i hits, %i misses, '
+                                  '%i evictions', render_cache.size(),
+                                  render_cache.hits, render_cache.misses,
+                                  render_cache.evictions)
+
+            if warm:
+                for obj in content.get_all():
+                    for attr in ('datetime', 'mdatetime', 'author'):
+                        getattr(obj, attr)
+
+            self._snapshot = (changectx, content, config)
+
+        # the current app context, if any, should see the new content.
+        ctx = _app_ctx_stack.top
+        if ctx is not None and ctx.app is self.app:
+            ctx.g.pop('blohg_snapshot', None)
+
+        if warm and self.app.config['WARMUP']:
+            self.warmup()
 
         reloaded.send(self)
 
-    def load_extensions(self):
+    def warmup(self, workers=None):
+        """Renders all the pages/posts that don't depend on other content, in
+        a pool of processes, storing the renderings in the render cache. If no
+        ``CACHE_DIR`` is configured, only the sources that fit in the render
+        cache are rendered.
+
+        :param workers: the number of processes. Defaults to the
+                        ``WARMUP_WORKERS`` configuration parameter.
+        :return: the number of sources rendered.
+        """
+        if workers is None:
+            workers = self.app.config['WARMUP_WORKERS']
+        limit = None
+        if render_cache.store is None:
+            # without a persistent store, the renderings that don't fit in the
+            # render cache would be evicted right away.
+            limit = max(render_cache.max_entries - len(render_cache), 0)
+            self.app.logger.warning('CACHE_DIR not configured, rendering at '
+                                    'most %i sources in the warmup', limit)
+        with self.app.app_context():
+            rv = self.content.warmup(workers, limit)
+        self.app.logger.debug('%i sources rendered by the warmup', rv)
+        return rv
+
+    def start_reloader(self, interval):
+        """Starts a background thread that reloads the repository every
+        ``interval`` seconds, if needed. Requests are served from the current
+        content while the new one is built.
+        """
+        if self._reloader is not None:
+            return
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    with self.app.app_context():
+                        self.reload(warm=True)
+                except Exception:
+                    self.app.logger.exception('Failed to reload the '
+                                              'repository')
+
+        thread = threading.Thread(target=run, name='blohg-reloader')
+        thread.daemon = True
+        self._reloader = (thread, stop)
+        thread.start()
+
+    def stop_reloader(self):
+        """Stops the background thread started by :meth:`start_reloader`."""
+        if self._reloader is None:
+            return
+        thread, stop = self._reloader
+        stop.set()
+        thread.join()
+        self._reloader = None
+
+    def load_extensions(self, changectx=None, config=None):
+        if changectx is None:
+            changectx = self.changectx
+        if config is None:
+            config = self.app.config
         if self.embedded_extensions:
-            ExtensionImporter.new(self.changectx,
-                                  self.app.config['EXTENSIONS_DIR'])
+            ExtensionImporter.new(changectx, config['EXTENSIONS_DIR'])
+        # the directives and roles registered by the extensions are
+        # collected from the registries of docutils.
+        old_directives = set(directives._directives)
+        old_roles = set(roles._roles)
         with self.app.app_context():
-            for ext in self.app.config['EXTENSIONS']:
+            # the extensions see the change context and the configuration
+            # being loaded.
+            _app_ctx_stack.top.g.blohg_snapshot = (changectx, self.content,
+                                                   config)
+            for ext in config['EXTENSIONS']:
                 __import__('blohg_%s' % ext)
             ctx = _app_ctx_stack.top
             if hasattr(ctx, 'extension_registry'):
                 for ext in ctx.extension_registry:
                     ext._load_extension(self.app)
+        extension_directives.update(set(directives._directives) -
+                                    old_directives)
+        extension_roles.update(set(roles._roles) - old_roles)
 
 
 def create_app(repo_path=None, revision_id=REVISION_DEFAULT,
-               autoinit=True, embedded_extensions=False, debug=False):
+               autoinit=True, embedded_extensions=False, debug=False,
+               reload_interval=None):
     """Application factory.
 
     :param repo_path: the path to the mercurial repository.
+    :param reload_interval: if set, the repository is reloaded by a background
+                            thread, every ``reload_interval`` seconds, instead
+                            of before each request.
     :return: the WSGI application (Flask instance).
     """
 
@@ -139,10 +320,16 @@ def create_app(repo_path=None, revision_id=REVISION_DEFAULT,
     app.config.setdefault('EXTENSIONS', [])
     app.config.setdefault('EXTENSIONS_DIR', 'ext')
     app.config.setdefault('THEME', 'Light')
+    app.config.setdefault('CACHE_DIR', None)
+    app.config.setdefault('CACHE_SIZE', 64 * 1024 * 1024)
+    app.config.setdefault('RENDER_CACHE_SIZE', 32 * 1024 * 1024)
+    app.config.setdefault('LEAN_CONTENT', False)
+    app.config.setdefault('WARMUP', False)
+    app.config.setdefault('WARMUP_WORKERS', None)
 
     app.config['REPO_PATH'] = repo_path
 
-    blohg = Blohg(app, embedded_extensions)
+    blohg = Blohg(app, embedded_extensions, reload_interval)
 
     app.add_url_rule('/static/<path:filename>', endpoint='static',
                      view_func=BlohgStaticFile('static'))
@@ -152,9 +339,10 @@ def create_app(repo_path=None, revision_id=REVISION_DEFAULT,
     # setup extensions
     babel = Babel(app)
 
-    @app.before_request
-    def before_request():
-        app.blohg.reload()
+    if blohg.reload_interval is None:
+        @app.before_request
+        def before_request():
+            app.blohg.reload()
 
     @app.context_processor
     def setup_jinja2():
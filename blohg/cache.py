@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.cache
+    ~~~~~~~~~~~
+
+    Module with a content-addressed cache for the output of the
+    reStructuredText parser, shared by all the revisions of the repository.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import docutils
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from flask import current_app, has_app_context, has_request_context, request
+
+from blohg.version import version
+
+# configuration variables that change the output of the parser.
+RENDER_CONFIG = ['ATTACHMENT_DIR', 'CONTENT_DIR', 'POST_EXT', 'EXTENSIONS']
+
+# version of the format of the renderings, to be increased when the parts
+# returned by the parser change.
+RENDER_FORMAT = 2
+
+# name of the database used to persist the renderings, inside CACHE_DIR.
+RENDER_STORE_FILE = 'blohg-render.sqlite'
+
+
+# digest of the extension files of the change contexts seen by render_key.
+_extensions_digests = weakref.WeakKeyDictionary()
+
+
+def _extensions_digest(changectx, ext_dir):
+    rv = _extensions_digests.get(changectx)
+    if rv is None or rv[0] != ext_dir:
+        digest = hashlib.sha1()
+        prefix = ext_dir.rstrip('/') + '/'
+        for fname in sorted(changectx.files):
+            if fname.startswith(prefix):
+                digest.update(('%s\0%s\0' % (fname, changectx.file_id(fname)))
+                              .encode('utf-8'))
+        rv = _extensions_digests[changectx] = (ext_dir, digest.hexdigest())
+    return rv[1]
+
+
+def render_key(content, rst_header_level, source_path=None,
+               dependencies=False):
+    """Returns the key of the rendering of the given reStructuredText source,
+    or ``None`` if it can't be cached.
+
+    The key is a digest of the source, of the settings of the parser, of the
+    enabled extensions and of the blohg and docutils versions. The output of
+    sources that depend on other content (links to other pages, lists of
+    subpages, included files, ...) also depends on the fingerprint of the
+    current content, and on the root URL of the current request, used by the
+    external URLs generated by the parser. The other sources can be rendered
+    outside of requests.
+    """
+    parts = [version, str(RENDER_FORMAT), docutils.__version__,
+             str(rst_header_level), source_path or '']
+    if has_app_context():
+        parts.extend([str(current_app.config.get(i)) for i in RENDER_CONFIG])
+        # the extensions embedded in the repository may change the parser.
+        changectx = getattr(current_app.blohg, 'changectx', None)
+        ext_dir = current_app.config.get('EXTENSIONS_DIR')
+        if changectx is not None and ext_dir:
+            parts.append(_extensions_digest(changectx, ext_dir))
+        if dependencies and has_request_context():
+            parts.append(request.url_root)
+        if dependencies:
+            fingerprint = getattr(current_app.blohg.content, 'fingerprint',
+                                  None)
+            if fingerprint is None:
+                return None
+            parts.append(fingerprint)
+    elif dependencies:
+        return None
+    key = hashlib.sha1()
+    for part in parts:
+        key.update(part.encode('utf-8'))
+        key.update(b'\0')
+    key.update(content.encode('utf-8'))
+    return key.hexdigest()
+
+
+class RenderStore(object):
+    """Persistent store of parser outputs, in a sqlite database shared by all
+    the processes serving the blog. When the data stored gets bigger than
+    ``max_size`` bytes, the least recently used entries are evicted, until
+    the data fits in ``evict_ratio`` of ``max_size``, so the following sets
+    don't evict again. The access time of the entries is only updated when it
+    is older than ``atime_window`` seconds, to avoid writing on every hit.
+
+    Errors from the database are ignored, the store is just a cache.
+    """
+
+    evict_ratio = 0.75
+    atime_window = 60
+
+    def __init__(self, filename, max_size=64 * 1024 * 1024):
+        self.filename = filename
+        self.max_size = max_size
+        self._local = threading.local()
+        conn = self._connect()
+        if conn is not None:
+            try:
+                with conn:
+                    conn.execute('CREATE TABLE IF NOT EXISTS renders ('
+                                 'key TEXT PRIMARY KEY, value BLOB, '
+                                 'size INTEGER, atime REAL)')
+                    conn.execute('CREATE INDEX IF NOT EXISTS renders_atime '
+                                 'ON renders (atime)')
+                    # running total of the sizes of the entries.
+                    conn.execute('CREATE TABLE IF NOT EXISTS meta ('
+                                 'name TEXT PRIMARY KEY, value INTEGER)')
+                    conn.execute('INSERT OR IGNORE INTO meta VALUES '
+                                 '(\'size\', (SELECT COALESCE(SUM(size), 0) '
+                                 'FROM renders))')
+            except sqlite3.Error:
+                pass
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                dirname = os.path.dirname(self.filename)
+                if dirname and not os.path.isdir(dirname):
+                    os.makedirs(dirname)
+                conn = sqlite3.connect(self.filename, timeout=1)
+                conn.execute('PRAGMA journal_mode=WAL')
+            except (OSError, sqlite3.Error):
+                return None
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute('SELECT value, atime FROM renders WHERE '
+                               'key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[1] < now - self.atime_window:
+                with conn:
+                    conn.execute('UPDATE renders SET atime = ? WHERE key = ?',
+                                 (now, key))
+            return json.loads(row[0].decode('utf-8'))
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def set(self, key, value):
+        conn = self._connect()
+        if conn is None:
+            return
+        data = json.dumps(value).encode('utf-8')
+        try:
+            with conn:
+                # the first statement takes the write lock, so the size of
+                # the replaced entry can't change before it is replaced.
+                conn.execute('UPDATE meta SET value = value + ? - COALESCE(('
+                             'SELECT size FROM renders WHERE key = ?), 0) '
+                             'WHERE name = \'size\'', (len(data), key))
+                conn.execute('INSERT OR REPLACE INTO renders VALUES '
+                             '(?, ?, ?, ?)', (key, data, len(data),
+                                              time.time()))
+                size = self._size(conn)
+                if size > self.max_size:
+                    self._evict(conn, size - int(self.max_size *
+                                                 self.evict_ratio))
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, size):
+        rows = conn.execute('SELECT key, size FROM renders ORDER BY atime')
+        keys = []
+        freed = 0
+        for key, key_size in rows:
+            if freed >= size:
+                break
+            keys.append((key,))
+            freed += key_size
+        conn.executemany('DELETE FROM renders WHERE key = ?', keys)
+        conn.execute('UPDATE meta SET value = value - ? WHERE name = '
+                     '\'size\'', (freed,))
+
+    def _size(self, conn):
+        row = conn.execute('SELECT value FROM meta WHERE name = \'size\'')\
+            .fetchone()
+        return row[0] if row is not None else 0
+
+    def size(self):
+        conn = self._connect()
+        if conn is None:
+            return 0
+        try:
+            return self._size(conn)
+        except sqlite3.Error:
+            return 0
+
+
+def _sizeof(value):
+    # approximate memory used by a parser output: the strings and lists of
+    # strings of the dictionary, and the dictionary itself.
+    rv = sys.getsizeof(value)
+    if not isinstance(value, dict):
+        return rv
+    for item in value.values():
+        rv += sys.getsizeof(item)
+        if isinstance(item, list):
+            rv += sum(sys.getsizeof(i) for i in item)
+    return rv
+
+
+class RenderCache(object):
+    """Thread-safe store of parser outputs, with the least recently used ones
+    evicted when it gets bigger than ``max_entries`` or than ``max_size``
+    bytes. If a :class:`RenderStore` is set, it is used as a second level,
+    persistent cache.
+
+    The number of hits, misses and evictions is kept in the ``hits``,
+    ``misses`` and ``evictions`` attributes.
+    """
+
+    def __init__(self, max_entries=4096, store=None,
+                 max_size=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.store = store
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _set(self, key, value):
+        size = _sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or \
+                  (self._size > self.max_size and len(self._entries) > 1):
+                self._size -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            rv = self._entries.get(key)
+            if rv is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rv[0]
+        if self.store is not None:
+            rv = self.store.get(key)
+            if rv is not None:
+                self._set(key, rv)
+                with self._lock:
+                    self.hits += 1
+                return rv
+        with self._lock:
+            self.misses += 1
+
+    def set(self, key, value):
+        self._set(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def size(self):
+        """Approximate number of bytes used by the parser outputs."""
+        return self._size
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+render_cache = RenderCache()
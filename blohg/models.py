@@ -9,49 +9,205 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
-import functools
+import hashlib
 import re
+import sys
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from docutils.utils import column_width
+from docutils.writers.html4css1 import HTMLTranslator
 from flask.helpers import locked_cached_property
 from time import time
 from jinja2 import Markup
 
+from blohg.cache import render_cache, render_key
 from blohg.rst_parser import parser
+from blohg.search import SearchIndex, plain_text
 from blohg.utils import parse_date
 
 re_metadata = re.compile(r'\.\. +([a-z][a-z_]*): *(.+)')
 re_read_more = re.compile(r'\.\. +read_more')
 re_author = re.compile(r'^(?P<name>[^<]*[^ ])( ?<(?P<email>[^<]*)>)?$')
+re_dependencies = re.compile(r':(page|attachment):`|\.\. +(subpages|include|'
+                             r'include-hg|attachment-image|'
+                             r'attachment-figure)::')
+re_markup_names = re.compile(r'^\s*\.\. +([\w.+-]+)::|:([\w.+-]+):`|'
+                             r'`:([\w.+-]+):', re.MULTILINE)
+re_adornment = re.compile(r'^([!-/:-@\[-`{-~])\1*$')
+re_explicit = re.compile(r'^\.\.( |$)')
+re_directive = re.compile(r'^\.\. +([_\[|]|[^ ]+::)')
+re_markup_title = re.compile(r'[*`|\\\[\]_@\t]|[a-zA-Z][a-zA-Z0-9.+-]*:\S')
+re_markup_paragraph = re.compile(r'[*`|\\\t]|::|\]_|_(?!\w)|^\s')
+re_block_start = re.compile(r'^([-*+=/:•‣⁃]|>>>|\.\.|\(?([0-9]+|[#a-zA-Z]|'
+                            r'[ivxlcdmIVXLCDM]+)[.)]( |$))')
+
+
+# names of the directives and roles registered by the extensions. their output
+# can depend on anything, then the pages/posts that use them are handled like
+# the ones that depend on other content.
+extension_directives = set()
+extension_roles = set()
+
+
+def scan_header(content):
+    """Scans the title and the first paragraph of a reStructuredText document,
+    without parsing it. Only simple documents are handled: an optional title,
+    comments and a paragraph without inline markup.
+
+    :param content: the reStructuredText source.
+    :return: a tuple with the title, as returned by the parser (HTML), and
+             the first paragraph at the root of the document (text), or
+             ``None`` if the document must be parsed to find them.
+    """
+    lines = [i.rstrip() for i in content.splitlines()] + ['', '']
+
+    def skip(i):
+        # skips blank lines and comments, like the metadata variables.
+        while i < len(lines) - 2:
+            if not lines[i]:
+                i += 1
+                continue
+            if re_explicit.match(lines[i]) is None:
+                break
+            if re_directive.match(lines[i]) is not None:
+                return None
+            i += 1
+            while lines[i].startswith((' ', '\t')):
+                i += 1
+            if lines[i]:
+                return None
+        return i
+
+    i = skip(0)
+    if i is None:
+        return None
+
+    # the title must be the only section title of its level, otherwise it
+    # isn't promoted to document title.
+    title, char = '', None
+    if re_adornment.match(lines[i]) is not None:
+        title, char = lines[i + 1].strip(), lines[i][0]
+        if lines[i + 2] != lines[i] or column_width(title) > len(lines[i]):
+            return None
+        i += 3
+    elif re_adornment.match(lines[i + 1]) is not None:
+        title, char = lines[i], lines[i + 1][0]
+        if lines[i].startswith((' ', '\t')) or \
+           column_width(title) > len(lines[i + 1]):
+            return None
+        i += 2
+    if char is not None:
+        if not title or lines[i] or re_markup_title.search(title) is not None:
+            return None
+        for line in lines[i:]:
+            if line and line == char * len(line):
+                return None
+        # escaped like the HTML writer does.
+        title = title.translate(HTMLTranslator.special_characters)
+        i = skip(i)
+        if i is None:
+            return None
+
+    if i >= len(lines) - 2:
+        return title, None
+    paragraph = []
+    while lines[i]:
+        if re_adornment.match(lines[i]) is not None or \
+           re_markup_paragraph.search(lines[i]) is not None:
+            return None
+        paragraph.append(lines[i].strip())
+        i += 1
+    if re_block_start.match(paragraph[0]) is not None:
+        return None
+    return title, ' '.join(paragraph)
+
+
+def _render(job):
+    # runs in the processes of the warmup pool. the errors are caught here,
+    # because some of the docutils exceptions can't be sent back to the main
+    # process, breaking the pool.
+    try:
+        return parser(*job)
+    except Exception:
+        return None
 
 
 class Page(object):
     """Pages are the very basic content element of a blog. They don't have tags
     nor other fancy stuff that belongs to posts."""
 
-    def __init__(self, filectx, content_dir, post_ext, rst_header_level):
+    def __init__(self, filectx, content_dir, post_ext, rst_header_level,
+                 content=None):
         self._filectx = filectx
         self._content_dir = content_dir
         self._post_ext = post_ext
         self._rst_header_level = rst_header_level
+        self._source = content
+        if self._source is None:
+            self._source = self._filectx.content
         self._vars = {}
         self._title = None
 
         # get metadata variables from rst source.
-        for i in re_metadata.finditer(self._filectx.content):
-            self._vars[i.group(1).strip()] = i.group(2).strip()
+        for i in re_metadata.finditer(self._source):
+            self._vars[sys.intern(i.group(1).strip())] = i.group(2).strip()
+
+    @property
+    def _content(self):
+        if self._source is not None:
+            return self._source
+        # the source was released, read it again without keeping it.
+        rv = self._filectx.content
+        self._filectx.release()
+        return rv
+
+    def release(self):
+        """Releases the source of the page, keeping just the metadata needed
+        by the listings. The source is read again from the file context when
+        needed.
+        """
+        self.has_dependencies
+        self.read_more
+        self._header
+        self._source = None
+        self._filectx.release()
 
     @locked_cached_property
+    def _source_path(self):
+        return ':repo:%s' % self.path
+
+    def _render_key(self, content):
+        # renderings are shared by all the pages with the same source and
+        # settings, even across revisions.
+        return render_key(content, self._rst_header_level, self._source_path,
+                          self.has_dependencies)
+
+    def _parse(self, content):
+        # the renderings aren't kept by the pages, but by the render cache,
+        # that has a bounded size. the ones that can't be cached are kept.
+        key = self._render_key(content)
+        if key is None:
+            renders = self.__dict__.setdefault('_renders', {})
+            if content not in renders:
+                renders[content] = parser(content, self._rst_header_level,
+                                          self._source_path)
+            return renders[content]
+        rv = render_cache.get(key)
+        if rv is None:
+            rv = parser(content, self._rst_header_level, self._source_path)
+            render_cache.set(key, rv)
+        return rv
+
+    @property
     def parsed_source(self):
-        return parser(self.full, self._rst_header_level,
-                      ':repo:%s' % self.path)
+        return self._parse(self.full)
 
-    @locked_cached_property
+    @property
     def parsed_abstract(self):
         if not self.read_more:
             return self.parsed_source
-        return parser(self.abstract, self._rst_header_level,
-                      ':repo:%s' % self.path)
+        return self._parse(self.abstract)
 
     @locked_cached_property
     def author(self):
@@ -63,25 +219,39 @@ class Page(object):
             return author_dict
         rv = re_author.match(author)
         if rv is None:
-            author_dict['name'] = author
+            author_dict['name'] = sys.intern(author)
             return author_dict
-        author_dict.update(rv.groupdict())
+        for key, value in rv.groupdict().items():
+            author_dict[key] = value and sys.intern(value)
         return author_dict
 
+    @locked_cached_property
+    def _header(self):
+        # the title and the first paragraph are usually needed by the listings,
+        # that shouldn't need to parse the documents.
+        return scan_header(self._content)
+
     @locked_cached_property
     def title(self):
-        return self._vars.get('title', self.parsed_source['title'])
+        if 'title' in self._vars:
+            return self._vars['title']
+        if self._header is not None:
+            return self._header[0]
+        return self.parsed_source['title']
 
     @locked_cached_property
     def description(self):
-        return self._vars.get('description',
-                              self.parsed_source['first_paragraph_as_text'])
+        if 'description' in self._vars:
+            return self._vars['description']
+        if self._header is not None:
+            return self._header[1]
+        return self.parsed_source['first_paragraph_as_text']
 
-    @locked_cached_property
+    @property
     def images(self):
         return self.parsed_source.get('images', [])
 
-    @locked_cached_property
+    @property
     def flash_videos(self):
         return self.parsed_source.get('flash_videos', [])
 
@@ -159,33 +329,51 @@ class Page(object):
             rv.append((code, alias))
         return rv
 
-    @locked_cached_property
+    @property
     def abstract(self):
-        return re_read_more.split(self._filectx.content)[0]
+        return re_read_more.split(self._content)[0]
 
-    @locked_cached_property
+    @property
     def abstract_html(self):
         return Markup(self.parsed_abstract['fragment'])
 
-    @locked_cached_property
+    @property
     def abstract_raw_html(self):
         return self.parsed_abstract['fragment']
 
-    @locked_cached_property
+    @property
     def full(self):
-        return self._filectx.content
+        return self._content
 
-    @locked_cached_property
+    @property
     def full_html(self):
         return Markup(self.parsed_source['fragment'])
 
-    @locked_cached_property
+    @property
     def full_raw_html(self):
         return self.parsed_source['fragment']
 
+    @property
+    def full_text(self):
+        return self.parsed_source['text']
+
     @locked_cached_property
     def read_more(self):
-        return len(re_read_more.split(self._filectx.content)) > 1
+        return len(re_read_more.split(self._content)) > 1
+
+    @locked_cached_property
+    def has_dependencies(self):
+        # the rendering of pages that link to other pages, list subpages,
+        # include or attach files depends on the content of other files.
+        content = self._content
+        if re_dependencies.search(content) is not None:
+            return True
+        if extension_directives or extension_roles:
+            for i in re_markup_names.finditer(content):
+                if (i.group(1) or '').lower() in extension_directives or \
+                   (i.group(2) or i.group(3) or '').lower() in extension_roles:
+                    return True
+        return False
 
     def get(self, key, default=None):
         return self._vars.get(key, default)
@@ -210,52 +398,321 @@ class Post(Page):
         # handle tags
         if 'tags' not in self._vars:
             return []
-        return [i.strip() for i in self._vars['tags'].split(',')]
+        return [sys.intern(i.strip()) for i in self._vars['tags'].split(',')]
 
 
 class Blog(object):
     """A blog is a list of posts and pages."""
 
-    def __init__(self, changectx, content_dir, post_ext, rst_header_level):
+    def __init__(self, changectx, content_dir, post_ext, rst_header_level,
+                 previous=None, lean=False):
         self._changectx = changectx
         self._content_dir = content_dir
         self._post_ext = post_ext
         self._rst_header_level = rst_header_level
         re_content = re.compile(r'^' + self._content_dir + r'[\\/](post)?.+' \
                                 + '\\' + self._post_ext + '$')
-        self._all = []
-        self.tags = set()  # it will be a list at the end of this method.
-        self.archives = set()  # it will be a list at the end of this method.
-        self.aliases = {}
-        for fname in self._changectx.files:
+
+        # reuse the pages/posts of the previous blog that didn't change, and
+        # look only at the files that changed.
+        reusable, fnames = self._diff(previous)
+        # the search index of the previous blog, if it was built, shares its
+        # postings with a new index, without the pages/posts that changed.
+        # the ones that changed are indexed when needed.
+        self._search_index = None
+        if reusable:
+            index = previous.__dict__.get('search_index')
+            if index is not None:
+                self._search_index = SearchIndex(index)
+                for obj in list(index.keys()):
+                    if reusable.get(obj.path) is not obj:
+                        self._search_index.remove(obj)
+            self._all = list(reusable.values())
+            # the reused pages/posts read their files from the new change
+            # context, otherwise they would keep the old ones alive.
+            for obj in self._all:
+                obj._filectx = self._changectx.get_filectx(obj.path)
+            self._tag_counts = dict(previous._tag_counts)
+            self._archive_counts = dict(previous._archive_counts)
+            self.aliases = dict(previous.aliases)
+            for obj in previous._all:
+                if reusable.get(obj.path) is not obj:
+                    self._remove(obj)
+        else:
+            self._all = []
+            self._tag_counts = {}
+            self._archive_counts = {}
+            self.aliases = {}
+
+        matches = []
+        for fname in fnames:
             rv = re_content.match(fname)
             if rv is not None:
-                cls = (rv.group(1) is None) and Page or Post
-                obj = cls(self._changectx.get_filectx(fname),
-                          self._content_dir, self._post_ext,
-                          self._rst_header_level)
-                for code, alias in obj.aliases:
-                    self.aliases[alias] = (code, obj.slug)
-                self._all.append(obj)
-                if hasattr(obj, 'tags'):
-                    self.tags = self.tags.union(set(obj.tags))
-                    self.archives.add((obj.datetime.year, obj.datetime.month))
-
-        # sort tags by "name" and convert them back to a list
-        self.tags = sorted(self.tags)
+                matches.append((fname, (rv.group(1) is None) and Page or Post))
+
+        # load the content of all the other pages/posts at once.
+        load_start = time()
+        contents = self._changectx.get_contents([i[0] for i in matches])
+        self.load_time = time() - load_start
+
+        for fname, cls in matches:
+            obj = cls(self._changectx.get_filectx(fname), self._content_dir,
+                      self._post_ext, self._rst_header_level, contents[fname])
+            self._all.append(obj)
+            self._add(obj)
+
+        # the sources of the pages/posts aren't kept in memory, if required.
+        if lean:
+            for obj in self._all:
+                obj.release()
+
+        # sort tags by "name"
+        self.tags = sorted(self._tag_counts)
+        self.tag_set = frozenset(self.tags)
 
         # sort archives, reverse by year/month
-        self.archives = sorted(self.archives, reverse=True)
+        self.archives = sorted(self._archive_counts, reverse=True)
+
+        # sort self, reverse by date, then by path
+        self._all.sort(key=lambda x: (-x.date, x.path))
+
+        # every index below keeps the order of self._all, then the published
+        # entries of any of them are the ones at the end, starting from the
+        # first one whose position in self._all is past the publication start.
+        self._positions = dict((obj.path, i) for i, obj in
+                               enumerate(self._all))
+        self._posts = [i for i in self._all if isinstance(i, Post)]
+        self._publication = self._find_publication()
+
+        # index by slug. more than one page/post may have the same slug, the
+        # most recent published one wins.
+        self._slugs = {}
+        for obj in self._all:
+            self._slugs.setdefault(obj.slug, []).append(obj)
+
+        # index posts by tag, keeping the lists sorted by date.
+        self._tag_lists = {}
+        for obj in self._all:
+            if hasattr(obj, 'tags'):
+                for tag in set(obj.tags):
+                    self._tag_lists.setdefault(tag, []).append(obj)
+        self._tag_sets = dict((tag, frozenset(posts)) for tag, posts in
+                              self._tag_lists.items())
+
+        # index posts by year and by (year, month), keeping the lists sorted
+        # by date.
+        self._archive_lists = {}
+        for obj in self._all:
+            if hasattr(obj, 'tags'):
+                year, month = obj.datetime.year, obj.datetime.month
+                self._archive_lists.setdefault(year, []).append(obj)
+                self._archive_lists.setdefault((year, month), []).append(obj)
+
+    def _add(self, obj):
+        for code, alias in obj.aliases:
+            self.aliases[alias] = (code, obj.slug)
+        if hasattr(obj, 'tags'):
+            for tag in set(obj.tags):
+                self._tag_counts[tag] = self._tag_counts.get(tag, 0) + 1
+            archive = (obj.datetime.year, obj.datetime.month)
+            self._archive_counts[archive] = \
+                self._archive_counts.get(archive, 0) + 1
+
+    def _remove(self, obj):
+        for code, alias in obj.aliases:
+            if self.aliases.get(alias) == (code, obj.slug):
+                del self.aliases[alias]
+        if hasattr(obj, 'tags'):
+            for tag in set(obj.tags):
+                self._tag_counts[tag] -= 1
+                if not self._tag_counts[tag]:
+                    del self._tag_counts[tag]
+            archive = (obj.datetime.year, obj.datetime.month)
+            self._archive_counts[archive] -= 1
+            if not self._archive_counts[archive]:
+                del self._archive_counts[archive]
+
+    def _diff(self, previous):
+        """Returns a dictionary with the pages/posts of the previous blog
+        whose files didn't change, by path, and the list of files that should
+        be looked at to find new or changed pages/posts. Pages/posts that
+        depend on other files are only reused if no file changed at all.
+        """
+        if previous is None or \
+           (previous._content_dir, previous._post_ext,
+            previous._rst_header_level) != (self._content_dir, self._post_ext,
+                                            self._rst_header_level):
+            return {}, self._changectx.files
+        old_ctx, new_ctx = previous._changectx, self._changectx
+        changed = set()
+        for fname in old_ctx.file_set | new_ctx.file_set:
+            file_id = new_ctx.file_id(fname)
+            if file_id is None or file_id != old_ctx.file_id(fname):
+                changed.add(fname)
+        reusable = {}
+        for obj in previous._all:
+            if obj.path in changed or (changed and obj.has_dependencies):
+                changed.add(obj.path)
+                continue
+            reusable[obj.path] = obj
+        if not reusable:
+            return {}, self._changectx.files
+        return reusable, sorted(changed & new_ctx.file_set)
+
+    def warmup(self, workers=None, limit=None):
+        """Renders the sources of all the pages/posts that don't depend on
+        other content and aren't in the render cache yet, in a pool of
+        processes, storing the renderings in the render cache.
+
+        :param workers: the number of processes. If ``None``, one per CPU.
+                        If ``1``, the sources are rendered by this process.
+        :param limit: the maximum number of sources rendered, the ones of the
+                      newest pages/posts first. If ``None``, no limit.
+        :return: the number of sources rendered.
+        """
+        jobs = {}
+        for obj in self._all:
+            if limit is not None and len(jobs) >= limit:
+                break
+            if obj.has_dependencies:
+                continue
+            sources = [obj.full]
+            if obj.read_more:
+                sources.append(obj.abstract)
+            for source in sources:
+                key = obj._render_key(source)
+                if key is None or key in jobs or \
+                   render_cache.get(key) is not None:
+                    continue
+                jobs[key] = (source, self._rst_header_level, obj._source_path)
+        if limit is not None:
+            jobs = dict(list(jobs.items())[:limit])
+        if not jobs:
+            return 0
+        # invalid sources are skipped. they are rendered again, and fail,
+        # when requested.
+        rv = 0
+        if workers == 1 or len(jobs) == 1:
+            for key, job in jobs.items():
+                result = _render(job)
+                if result is not None:
+                    render_cache.set(key, result)
+                    rv += 1
+            return rv
+        with ProcessPoolExecutor(workers) as executor:
+            futures = dict((executor.submit(_render, job), key)
+                           for key, job in jobs.items())
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception:
+                    continue
+                if result is not None:
+                    render_cache.set(futures[future], result)
+                    rv += 1
+        return rv
 
-        # sort self, reverse by date
-        self._all.sort(key=functools.cmp_to_key(lambda a, b: b.date - a.date))
+    def memory_usage(self):
+        """Approximate number of bytes used by the pages/posts, including
+        their metadata, sources and renderings, and by the data of their
+        files. The objects shared with the change context aren't included.
+        """
+        seen = set()
+
+        def sizeof(obj):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            rv = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                for key, value in obj.items():
+                    rv += sizeof(key) + sizeof(value)
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                for value in obj:
+                    rv += sizeof(value)
+            return rv
+
+        rv = 0
+        for obj in self._all:
+            rv += sizeof(obj) + sizeof(obj.__dict__)
+            for attr in ('data', 'content'):
+                rv += sizeof(obj._filectx.__dict__.get(attr))
+        return rv
+
+    @locked_cached_property
+    def _files_fingerprint(self):
+        key = hashlib.sha1()
+        for fname in self._changectx.files:
+            file_id = self._changectx.file_id(fname)
+            if file_id is None:
+                return None
+            key.update(('%s\0%r\0' % (fname, file_id)).encode('utf-8'))
+        return key.hexdigest()
 
     @property
-    def published(self):
+    def fingerprint(self):
+        """Digest of the state of all the files and of the list of published
+        pages/posts, or ``None`` if the backend can't identify the files. Used
+        to cache the rendering of pages that depend on other content.
+        """
+        if self._files_fingerprint is None:
+            return None
+        start = self._published_start
+        fingerprint = self.__dict__.get('_fingerprint')
+        if fingerprint is not None and fingerprint[0] == start:
+            return fingerprint[1]
+        key = hashlib.sha1(self._files_fingerprint.encode('utf-8'))
+        for obj in self._all[start:]:
+            key.update(('%s\0' % obj.path).encode('utf-8'))
+        self._fingerprint = (start, key.hexdigest())
+        return self._fingerprint[1]
+
+    def _find_publication(self):
+        """Returns the position of the first published page/post in the
+        date-sorted list and the date of the next page/post to be published,
+        if any. The publication state is monotonic on the date, then the
+        position is found by bisecting.
+        """
         now = int(time())
-        for obj in self._all:
-            if self._changectx.published(obj.date, now):
-                yield obj
+        lo, hi = 0, len(self._all)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._changectx.published(self._all[mid].date, now):
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo == 0:
+            return lo, None
+        return lo, self._all[lo - 1].date
+
+    @property
+    def _published_start(self):
+        # the position is only looked for again after the date of the next
+        # scheduled page/post, when it goes live.
+        start, deadline = self._publication
+        if deadline is not None and \
+           self._changectx.published(deadline, int(time())):
+            self._publication = self._find_publication()
+            start = self._publication[0]
+        return start
+
+    def _published_index(self, entries):
+        start = self._published_start
+        lo, hi = 0, len(entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._positions[entries[mid].path] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _published_entries(self, entries):
+        return entries[self._published_index(entries):]
+
+    @property
+    def published(self):
+        return self._all[self._published_start:]
 
     def get(self, slug):
         """Method that returns a :class:`Page` or a :class:`Post` object for
@@ -264,9 +721,9 @@ class Blog(object):
         :param slug: the slug string.
         :return: a :class:`Page` or a :class:`Post`
         """
-        for entry in self.published:
-            if entry.slug == slug:
-                return entry
+        entries = self._published_entries(self._slugs.get(slug, []))
+        if entries:
+            return entries[0]
 
     def get_all(self, only_posts=False):
         """Method that returns a list of :class:`Page` or :class:`Post`
@@ -278,8 +735,8 @@ class Blog(object):
         :return: a list of :class:`Page` or :class:`Post` objects.
         """
         if only_posts:
-            return [i for i in self.published if isinstance(i, Post)]
-        return list(self.published)
+            return self._published_entries(self._posts)
+        return self.published
 
     def get_by_tag(self, tag):
         """Method that returns a list of :class:`Post` objects for a
@@ -290,30 +747,87 @@ class Blog(object):
         """
         if not isinstance(tag, list):
             tag = [tag]
-        rv = []
-        for obj in self.published:
-            if not hasattr(obj, 'tags'):
-                continue
-            found = True
-            for _tag in tag:
-                if _tag not in obj.tags:
-                    found = False
-            if found:
-                rv.append(obj)
-        return rv
-
-    def get_from_archive(self, year, month):
+        if not tag:
+            return self.get_all(True)
+        for _tag in tag:
+            if _tag not in self._tag_lists:
+                return []
+
+        # walk the smallest list, checking the smallest sets first.
+        tag = sorted(set(tag), key=lambda x: len(self._tag_lists[x]))
+        sets = [self._tag_sets[i] for i in tag[1:]]
+        return [obj for obj in self._published_entries(self._tag_lists[tag[0]])
+                if all(obj in i for i in sets)]
+
+    def get_from_archive(self, year, month=None):
         """Method that returns a list of :class:`Post` objects for a
         given year and month.
 
         :param year: the required year.
-        :param month: the required month.
+        :param month: the required month. If ``None``, the posts from the
+                      whole year are returned.
         :return: a list of :class:`Post` objects.
         """
-        if (year, month) not in self.archives:
-            return []
-        rv = []
-        for obj in self.published:
-            if obj.datetime.year == year and obj.datetime.month == month:
-                rv.append(obj)
-        return rv
+        key = year if month is None else (year, month)
+        return self._published_entries(self._archive_lists.get(key, []))
+
+    @locked_cached_property
+    def search_index(self):
+        """:class:`~blohg.search.SearchIndex` of the titles, tags and texts of
+        all the posts, by :class:`Post` object.
+        """
+        index = self._search_index or SearchIndex()
+        self._search_index = None
+        posts = set(self._posts)
+        for obj in list(index.keys()):
+            if obj not in posts:
+                index.remove(obj)
+        for obj in self._posts:
+            if obj not in index:
+                index.add(obj, [(Markup(obj.title).striptags(), 3),
+                                (' '.join(obj.tags), 2),
+                                (plain_text(obj._content), 1)])
+        return index
+
+    def search(self, query):
+        """Method that returns a list of the published :class:`Post` objects
+        with the words of the given query, the most relevant first.
+
+        :param query: the query string.
+        :return: a list of :class:`Post` objects.
+        """
+        start = self._published_start
+        return [obj for score, obj in self.search_index.search(query)
+                if self._positions[obj.path] >= start]
+
+    def get_page(self, page, per_page, tag=None, archive=None):
+        """Method that returns the :class:`Post` objects of a page of a
+        listing, and the number of pages of the listing. Only the posts of the
+        page are looked at, unless more than one tag is given.
+
+        :param page: the page number, starting from 1.
+        :param per_page: the number of posts per page.
+        :param tag: a list of tag identifier strings, to list only the posts
+                    with all the tags.
+        :param archive: a year or a ``(year, month)`` tuple, to list only the
+                        posts from this period.
+        :return: a tuple with a list of :class:`Post` objects and the number
+                 of pages.
+        """
+        if tag is not None and not isinstance(tag, list):
+            tag = [tag]
+        if tag and len(set(tag)) > 1:
+            entries, start = self.get_by_tag(tag), 0
+        else:
+            if tag:
+                entries = self._tag_lists.get(tag[0], [])
+            elif archive is not None:
+                entries = self._archive_lists.get(archive, [])
+            else:
+                entries = self._posts
+            start = self._published_index(entries)
+        num_pages = (len(entries) - start + per_page - 1) // per_page
+        if page < 1:
+            return [], num_pages
+        init = start + (page - 1) * per_page
+        return entries[init:init + per_page], num_pages
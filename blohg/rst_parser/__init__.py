@@ -35,4 +35,4 @@ def parser(content, rst_header_level, source_path=None):
                           writer=BlohgWriter(), settings_overrides=settings)
     return {'title': parts['title'], 'fragment': parts['fragment'],
             'first_paragraph_as_text': parts['first_paragraph_as_text'],
-            'images': parts['images']}
+            'images': parts['images'], 'text': parts['text']}
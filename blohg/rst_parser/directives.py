@@ -273,7 +273,7 @@ class AttachmentImage(Image):
         my_file = directives.uri(self.arguments[0])
         full_path = posixpath.join(current_app.config['ATTACHMENT_DIR'],
                                    my_file)
-        if full_path not in current_app.blohg.changectx.files:
+        if full_path not in current_app.blohg.changectx.file_set:
             raise self.error(
                 'Error in "%s" directive: File not found: %s.' % (
                     self.name, full_path
@@ -290,7 +290,7 @@ class AttachmentFigure(Figure):
         my_file = directives.uri(self.arguments[0])
         full_path = posixpath.join(current_app.config['ATTACHMENT_DIR'],
                                    my_file)
-        if full_path not in current_app.blohg.changectx.files:
+        if full_path not in current_app.blohg.changectx.file_set:
             raise self.error(
                 'Error in "%s" directive: File not found: %s.' % (
                     self.name, full_path
@@ -22,12 +22,13 @@ class BlohgWriter(Writer):
         self.translator_class = BlohgHTMLTranslator
 
     def assemble_parts(self):
-        # we will add 2 new parts to the writer: 'first_paragraph_as_text' and
-        # 'images'
+        # we will add 3 new parts to the writer: 'first_paragraph_as_text',
+        # 'images' and 'text'
         Writer.assemble_parts(self)
         self.parts['first_paragraph_as_text'] = \
             self.visitor.first_paragraph_as_text
         self.parts['images'] = self.visitor.images
+        self.parts['text'] = ' '.join(self.visitor.text)
 
 
 class BlohgHTMLTranslator(HTMLTranslator):
@@ -36,6 +37,17 @@ class BlohgHTMLTranslator(HTMLTranslator):
         HTMLTranslator.__init__(self, document)
         self.first_paragraph_as_text = None
         self.images = []
+        # the text of the document, without the markup. comments, raw content
+        # and substitution definitions are skipped by the writer, standalone
+        # URLs are skipped here.
+        self.text = []
+
+    def visit_Text(self, node):
+        text = node.astext()
+        if not isinstance(node.parent, nodes.reference) or \
+           node.parent.get('refuri') != text:
+            self.text.append(text)
+        HTMLTranslator.visit_Text(self, node)
 
     def visit_iframe_flash_video(self, node):
         if 'thumbnail_uri' in node:
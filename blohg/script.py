@@ -18,7 +18,9 @@ from warnings import filterwarnings
 from werkzeug.routing import Map
 
 from blohg import create_app
-from blohg.vcs import backends, REVISION_DEFAULT, REVISION_WORKING_DIR
+from blohg.vcs import get_backends, load_repo, REVISION_DEFAULT, \
+     REVISION_WORKING_DIR
+from blohg.vcs_backends.snapshot.archive import SNAPSHOT_FILE, write_snapshot
 
 # filter MissingURLGeneratorWarning warnings.
 filterwarnings('ignore', category=MissingURLGeneratorWarning)
@@ -118,6 +120,9 @@ def freeze(repo_path, disable_embedded_extensions, serve, noindex):
         freezer.serve()
 
 
+creatable_backends = [i for i in get_backends() if i.creatable]
+
+
 @cli.command()
 @click.option('--repo-path', default='.', metavar='REPO_PATH',
               help='Repository path.')
@@ -125,14 +130,14 @@ def initrepo(repo_path, vcs):
     '''Initialize a blohg repo, using the default template.'''
 
     repo = None
-    for backend in backends:
+    for backend in creatable_backends:
         if backend.identifier == vcs:
             repo = backend
             break
     try:
         if repo is None:
-            if vcs is None and len(backends) > 0:
-                repo = backends[0]
+            if vcs is None and len(creatable_backends) > 0:
+                repo = creatable_backends[0]
             else:
                 raise RuntimeError('No VCS backend found for repository: %s'
                                    % repo_path)
@@ -140,7 +145,7 @@ def initrepo(repo_path, vcs):
     except RuntimeError as err:
         click.echo(str(err), file=sys.stderr)
 
-for backend in backends:
+for backend in creatable_backends:
     # decorating the function like a boss :P
     initrepo = click.option('--%s' % backend.identifier, 'vcs',
                             flag_value=backend.identifier,
@@ -148,6 +153,51 @@ for backend in backends:
                             % backend.name)(initrepo)
 
 
+@cli.command()
+@click.option('--repo-path', default='.', metavar='REPO_PATH',
+              help='Repository path.')
+@click.option('--working-dir', '-w', is_flag=True,
+              help='Use files from the working directory, instead of the '
+              'default branch.')
+@click.option('--output', '-o', default=SNAPSHOT_FILE, metavar='OUTPUT',
+              help='Snapshot file.')
+def snapshot(repo_path, working_dir, output):
+    '''Write a snapshot of the repository into a single file.'''
+
+    revision_id = REVISION_DEFAULT
+    if working_dir:
+        revision_id = REVISION_WORKING_DIR
+    try:
+        repo = load_repo(os.path.abspath(repo_path))
+        write_snapshot(repo.get_changectx(revision_id), output)
+    except RuntimeError as err:
+        click.echo(str(err), file=sys.stderr)
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--repo-path', default='.', metavar='REPO_PATH',
+              help='Repository path.')
+@click.option('--disable-embedded-extensions', is_flag=True,
+              help='Disable embedded extensions.')
+@click.option('--workers', '-j', type=click.INT, default=None,
+              metavar='WORKERS',
+              help='Number of processes. Defaults to the number of CPUs.')
+def warmup(repo_path, disable_embedded_extensions, workers):
+    '''Render all the pages/posts into the render cache.'''
+
+    app = _create_app(repo_path, disable_embedded_extensions)
+    try:
+        app.blohg.init_repo(REVISION_DEFAULT)
+    except RuntimeError as err:
+        click.echo(str(err), file=sys.stderr)
+        sys.exit(1)
+    if app.config['CACHE_DIR'] is None:
+        click.echo('CACHE_DIR not configured, the renderings will not be '
+                   'persisted.', file=sys.stderr)
+    click.echo('%i sources rendered.' % app.blohg.warmup(workers))
+
+
 @cli.command()
 @click.option('--repo-path', default='.', metavar='REPO_PATH',
               help='Repository path.')
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.search
+    ~~~~~~~~~~~~
+
+    Module with an in-memory inverted index for full-text search of the
+    posts, ranked with BM25.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import math
+import re
+
+re_word = re.compile(r'[^\W_]+', re.UNICODE)
+re_explicit = re.compile(r'^\.\.(\s+(.*))?$')
+re_directive = re.compile(r'^([\w:+.-]+)::(\s|$)')
+re_footnote = re.compile(r'^\[[^\]]+\](\s+(.*))?$')
+re_option = re.compile(r'^:[^:]+:(\s|$)')
+re_role = re.compile(r':[\w:+.-]+:(?=`)|(?<=`):[\w:+.-]+:')
+re_embedded_uri = re.compile(r'\s*<[^<>`]+>(?=`)')
+re_uri = re.compile(r'\b([a-z][a-z0-9+.-]*://|mailto:)\S+', re.IGNORECASE)
+
+# directives whose content isn't text.
+skip_directives = set(['raw'])
+
+
+def tokenize(text):
+    """Returns the lowercase words of the given text."""
+    return [i.lower() for i in re_word.findall(text)]
+
+
+def plain_text(source):
+    """Returns the text of the given reStructuredText source, without the
+    markup. Comments, targets, substitution definitions, the arguments and
+    options of the directives, role names and URIs are removed with a single
+    pass over the source, without parsing it.
+    """
+    rv = []
+    skip = None  # indentation of the explicit markup block being skipped
+    options = None  # indentation of the directive with the options
+    for line in source.splitlines():
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+        if skip is not None:
+            if not stripped or indent > skip:
+                continue
+            skip = None
+        if options is not None:
+            if indent > options and re_option.match(stripped):
+                continue
+            options = None
+        match = re_explicit.match(stripped)
+        if match is not None:
+            body = match.group(2) or ''
+            directive = re_directive.match(body)
+            footnote = re_footnote.match(body)
+            if directive is not None and \
+               directive.group(1) not in skip_directives:
+                options = indent
+            elif footnote is not None:
+                rv.append(footnote.group(2) or '')
+            else:
+                skip = indent
+            continue
+        line = re_embedded_uri.sub('', stripped)
+        line = re_role.sub('', line)
+        rv.append(re_uri.sub('', line))
+    return '\n'.join(rv)
+
+
+class SearchIndex(object):
+    """Inverted index of documents made of weighted text fields. The documents
+    are ranked with BM25, counting each word of a field as many times as the
+    weight of the field.
+
+    :param previous: a :class:`SearchIndex` to copy the documents from, that
+                     isn't changed by this one. The postings of the words are
+                     shared with it, and copied only when changed.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, previous=None):
+        # word -> {key: frequency}
+        self._postings = {}
+        # key -> (length, {word: frequency})
+        self._documents = {}
+        self._total_length = 0
+        # words whose postings belong to this index, or None if all of them.
+        self._owned = None
+        if previous is not None:
+            self._postings = dict(previous._postings)
+            self._documents = dict(previous._documents)
+            self._total_length = previous._total_length
+            self._owned = set()
+
+    def _own(self, word):
+        # returns the postings of the word, copying them if shared.
+        postings = self._postings.get(word)
+        if self._owned is None or word in self._owned:
+            return postings
+        self._owned.add(word)
+        if postings is not None:
+            postings = self._postings[word] = dict(postings)
+        return postings
+
+    def __contains__(self, key):
+        return key in self._documents
+
+    def __len__(self):
+        return len(self._documents)
+
+    def keys(self):
+        return self._documents.keys()
+
+    def add(self, key, fields):
+        """Adds a document to the index, replacing the document with the same
+        key, if any.
+
+        :param key: the key of the document.
+        :param fields: a list of ``(text, weight)`` tuples.
+        """
+        self.remove(key)
+        words = {}
+        for text, weight in fields:
+            for word in tokenize(text):
+                words[word] = words.get(word, 0) + weight
+        length = sum(words.values())
+        self._documents[key] = (length, words)
+        self._total_length += length
+        for word, frequency in words.items():
+            postings = self._own(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+            postings[key] = frequency
+
+    def remove(self, key):
+        """Removes a document from the index, if it is there."""
+        if key not in self._documents:
+            return
+        length, words = self._documents.pop(key)
+        self._total_length -= length
+        for word in words:
+            postings = self._own(word)
+            del postings[key]
+            if not postings:
+                del self._postings[word]
+
+    def search(self, query):
+        """Returns the keys of the documents with any of the words of the
+        query, the best ranked first.
+
+        :param query: the query string.
+        :return: a list of ``(score, key)`` tuples.
+        """
+        if not self._documents:
+            return []
+        count = len(self._documents)
+        average = float(self._total_length) / count or 1.0
+        scores = {}
+        for word in set(tokenize(query)):
+            postings = self._postings.get(word)
+            if postings is None:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) /
+                           (len(postings) + 0.5))
+            for key, frequency in postings.items():
+                length = self._documents[key][0]
+                norm = self.k1 * (1 - self.b + self.b * length / average)
+                scores[key] = scores.get(key, 0) + \
+                    idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(((score, key) for key, score in scores.items()),
+                      key=lambda x: -x[0])
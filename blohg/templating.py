@@ -26,7 +26,7 @@ class BlohgLoader(BaseLoader):
     def get_source(self, environment, template):
         pieces = split_template_path(template)
         filename = posixpath.join(self.template_folder, *pieces)
-        if filename in current_app.blohg.changectx.files:
+        if filename in current_app.blohg.changectx.file_set:
             filectx = current_app.blohg.changectx.get_filectx(filename)
 
             def up2date():
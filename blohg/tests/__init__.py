@@ -12,31 +12,49 @@
 import unittest
 
 from blohg.tests.app import AppTestCase
+from blohg.tests.cache import RenderCacheTestCase, RenderKeyTestCase, \
+     RenderStoreTestCase
 from blohg.tests.ext import BlohgBlueprintTestCase, BlohgExtensionTestCase, \
      ExtensionImporterTestCase
 from blohg.tests.rst_parser.directives import VimeoTestCase, YoutubeTestCase, \
      SourceCodeTestCase, MathTestCase, AttachmentImageTestCase, \
      AttachmentFigureTestCase, SubPagesTestCase, IncludeHgTestCase
+from blohg.tests.vcs_backends.fs import FsRepositoryTestCase
+from blohg.tests.vcs_backends.fs.changectx import ChangeCtxDefaultTestCase \
+     as FsChangeCtxDefaultTestCase, ChangeCtxWorkingDirTestCase as \
+     FsChangeCtxWorkingDirTestCase
+from blohg.tests.vcs_backends.snapshot import SnapshotRepositoryTestCase
+from blohg.tests.vcs_backends.snapshot.changectx import \
+     ChangeCtxDefaultTestCase as SnapshotChangeCtxDefaultTestCase, \
+     ChangeCtxWorkingDirTestCase as SnapshotChangeCtxWorkingDirTestCase
 from blohg.tests.vcs_backends.git import GitRepositoryTestCase
 from blohg.tests.vcs_backends.git.changectx import ChangeCtxDefaultTestCase \
      as GitChangeCtxDefaultTestCase, ChangeCtxWorkingDirTestCase as \
      GitChangeCtxWorkingDirTestCase
 from blohg.tests.vcs_backends.git.filectx import FileCtxTestCase as \
      GitFileCtxTestCase
+from blohg.tests.vcs_backends.git.history import HistoryIndexTestCase as \
+     GitHistoryIndexTestCase
 from blohg.tests.vcs_backends.hg import HgRepositoryTestCase
 from blohg.tests.vcs_backends.hg.changectx import ChangeCtxDefaultTestCase, \
      ChangeCtxWorkingDirTestCase
 from blohg.tests.vcs_backends.hg.filectx import FileCtxTestCase
-from blohg.tests.models import BlogTestCase, PageTestCase, PostTestCase
+from blohg.tests.vcs_backends.hg.history import HistoryIndexTestCase
+from blohg.tests.models import BlogTestCase, PageTestCase, PostTestCase, \
+     ScanHeaderTestCase
+from blohg.tests.search import SearchIndexTestCase
 from blohg.tests.templating import BlohgLoaderTestCase
 from blohg.tests.utils import UtilsTestCase
-from blohg.tests.vcs import LoadRepoTestCase
+from blohg.tests.vcs import LoadRepoTestCase, RepositoryPoolTestCase
 from blohg.tests.views import ViewsTestCase
 
 
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(AppTestCase))
+    suite.addTest(unittest.makeSuite(RenderCacheTestCase))
+    suite.addTest(unittest.makeSuite(RenderKeyTestCase))
+    suite.addTest(unittest.makeSuite(RenderStoreTestCase))
     suite.addTest(unittest.makeSuite(BlohgBlueprintTestCase))
     suite.addTest(unittest.makeSuite(BlohgExtensionTestCase))
     suite.addTest(unittest.makeSuite(ExtensionImporterTestCase))
@@ -48,19 +66,30 @@ def suite():
     suite.addTest(unittest.makeSuite(AttachmentFigureTestCase))
     suite.addTest(unittest.makeSuite(SubPagesTestCase))
     suite.addTest(unittest.makeSuite(IncludeHgTestCase))
+    suite.addTest(unittest.makeSuite(FsRepositoryTestCase))
+    suite.addTest(unittest.makeSuite(FsChangeCtxDefaultTestCase))
+    suite.addTest(unittest.makeSuite(FsChangeCtxWorkingDirTestCase))
+    suite.addTest(unittest.makeSuite(SnapshotRepositoryTestCase))
+    suite.addTest(unittest.makeSuite(SnapshotChangeCtxDefaultTestCase))
+    suite.addTest(unittest.makeSuite(SnapshotChangeCtxWorkingDirTestCase))
     suite.addTest(unittest.makeSuite(GitRepositoryTestCase))
     suite.addTest(unittest.makeSuite(GitChangeCtxDefaultTestCase))
     suite.addTest(unittest.makeSuite(GitChangeCtxWorkingDirTestCase))
     suite.addTest(unittest.makeSuite(GitFileCtxTestCase))
+    suite.addTest(unittest.makeSuite(GitHistoryIndexTestCase))
     suite.addTest(unittest.makeSuite(HgRepositoryTestCase))
     suite.addTest(unittest.makeSuite(ChangeCtxDefaultTestCase))
     suite.addTest(unittest.makeSuite(ChangeCtxWorkingDirTestCase))
     suite.addTest(unittest.makeSuite(FileCtxTestCase))
+    suite.addTest(unittest.makeSuite(HistoryIndexTestCase))
     suite.addTest(unittest.makeSuite(BlogTestCase))
     suite.addTest(unittest.makeSuite(PageTestCase))
     suite.addTest(unittest.makeSuite(PostTestCase))
+    suite.addTest(unittest.makeSuite(ScanHeaderTestCase))
+    suite.addTest(unittest.makeSuite(SearchIndexTestCase))
     suite.addTest(unittest.makeSuite(BlohgLoaderTestCase))
     suite.addTest(unittest.makeSuite(UtilsTestCase))
     suite.addTest(unittest.makeSuite(LoadRepoTestCase))
+    suite.addTest(unittest.makeSuite(RepositoryPoolTestCase))
     suite.addTest(unittest.makeSuite(ViewsTestCase))
     return suite
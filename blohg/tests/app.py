@@ -12,6 +12,7 @@
 
 import codecs
 import os
+import time
 import unittest
 
 from jinja2 import ChoiceLoader
@@ -20,6 +21,7 @@ from shutil import rmtree
 from tempfile import mkdtemp
 
 from blohg import create_app
+from blohg.cache import render_cache
 from blohg.vcs_backends.hg import HgRepository
 from blohg.vcs_backends.hg.utils import u2hg
 from blohg.vcs import REVISION_DEFAULT, REVISION_WORKING_DIR
@@ -47,6 +49,85 @@ class AppTestCase(unittest.TestCase):
         self.assertTrue(isinstance(app.jinja_loader, ChoiceLoader),
                         'Invalid Jinja2 loader.')
 
+    def test_warmup(self):
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo',
+                        addremove=True)
+        render_cache.clear()
+        app = create_app(repo_path=self.repo_path, autoinit=False)
+        app.config['WARMUP'] = True
+        app.config['WARMUP_WORKERS'] = 2
+        app.blohg.init_repo(REVISION_DEFAULT)
+        with app.test_request_context('/', 'http://foo.com/'):
+            posts = app.blohg.content.get_all(True)
+            self.assertTrue(len(posts) > 0)
+            for post in posts:
+                self.assertTrue(render_cache.get(post._render_key(post.full))
+                                is not None)
+        self.assertEqual(app.blohg.warmup(), 0)
+        render_cache.clear()
+
+        # the reloads done before the requests don't warm up.
+        with codecs.open(os.path.join(self.repo_path,
+                                      app.config['CONTENT_DIR'], 'about.rst'),
+                         'a', encoding='utf-8') as fp:
+            fp.write('\n\nTHIS IS A TEST!\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        rv = app.test_client().get('/about/')
+        self.assertTrue(b'THIS IS A TEST!' in rv.data)
+        self.assertEqual(len(render_cache), 1)
+        render_cache.clear()
+
+    def test_warmup_without_store(self):
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo',
+                        addremove=True)
+        render_cache.clear()
+        max_entries = render_cache.max_entries
+        render_cache.max_entries = 2
+        try:
+            app = create_app(repo_path=self.repo_path, autoinit=False)
+            app.config['WARMUP'] = True
+            app.config['WARMUP_WORKERS'] = 1
+            with self.assertLogs(app.logger, 'WARNING'):
+                app.blohg.init_repo(REVISION_DEFAULT)
+            self.assertEqual(len(render_cache), 2)
+        finally:
+            render_cache.max_entries = max_entries
+            render_cache.clear()
+
+    def test_extension_dependencies(self):
+        ext_dir = os.path.join(self.repo_path, 'ext')
+        os.makedirs(ext_dir)
+        with codecs.open(os.path.join(ext_dir, 'blohg_lol_directive.py'),
+                         'w', encoding='utf-8') as fp:
+            fp.write('from docutils import nodes\n'
+                     'from docutils.parsers.rst import Directive, '
+                     'directives\n'
+                     'from blohg.ext import BlohgExtension\n\n'
+                     'ext = BlohgExtension(__name__)\n\n'
+                     'class Lol(Directive):\n'
+                     '    def run(self):\n'
+                     '        return [nodes.paragraph(text="lol")]\n\n'
+                     '@ext.setup_extension\n'
+                     'def setup_extension(app):\n'
+                     '    directives.register_directive("lol-test", Lol)\n')
+        with codecs.open(os.path.join(self.repo_path, 'config.yaml'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('\nEXTENSIONS:\n  - lol_directive\n')
+        with codecs.open(os.path.join(self.repo_path, 'content', 'lol.rst'),
+                         'w', encoding='utf-8') as fp:
+            fp.write('Lol\n===\n\n.. lol-test::\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo',
+                        addremove=True)
+        app = create_app(repo_path=self.repo_path, autoinit=False,
+                         embedded_extensions=True)
+        app.blohg.init_repo(REVISION_DEFAULT)
+        with app.test_request_context('/', 'http://foo.com/'):
+            page = app.blohg.content.get('lol')
+            self.assertTrue(page.has_dependencies)
+            self.assertTrue('<p>lol</p>' in page.full_html)
+            self.assertFalse(app.blohg.content.get('post/lorem-ipsum')
+                             .has_dependencies)
+
     def test_reload_changectx_default(self):
         app = create_app(repo_path=self.repo_path, autoinit=False)
         commands.add(self.ui, self.repo)
@@ -123,3 +204,58 @@ class AppTestCase(unittest.TestCase):
         commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
         rv = client.get('/about/')
         self.assertTrue(b'THIS IS another TEST!' in rv.data)
+
+    def test_reload_interval(self):
+        commands.add(self.ui, self.repo)
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        app = create_app(repo_path=self.repo_path, reload_interval=0.05)
+        try:
+            client = app.test_client()
+            rv = client.get('/about/')
+            self.assertFalse(b'THIS IS A TEST!' in rv.data)
+            with codecs.open(os.path.join(self.repo_path,
+                                          app.config['CONTENT_DIR'],
+                                          'about.rst'),
+                             'a', encoding='utf-8') as fp:
+                fp.write('\n\nTHIS IS A TEST!\n')
+            with app.app_context():
+                content = app.blohg.content
+                commands.commit(self.ui, self.repo, message=b'foo',
+                                user=b'foo')
+                for i in range(100):
+                    if app.blohg._snapshot[1] is not content:
+                        break
+                    time.sleep(0.05)
+                self.assertFalse(app.blohg._snapshot[1] is content)
+
+                # the app context keeps the content it saw first
+                self.assertTrue(app.blohg.content is content)
+            rv = client.get('/about/')
+            self.assertTrue(b'THIS IS A TEST!' in rv.data)
+        finally:
+            app.blohg.stop_reloader()
+
+    def test_reload_config(self):
+        commands.add(self.ui, self.repo)
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        app = create_app(repo_path=self.repo_path, autoinit=False)
+        app.blohg.init_repo(REVISION_DEFAULT)
+        title = app.config['TITLE']
+        with codecs.open(os.path.join(self.repo_path, 'config.yaml'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('\nTITLE: lol\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        with app.app_context():
+            content = app.blohg.content
+            self.assertEqual(app.config['TITLE'], title)
+            with app.app_context():
+                app.blohg.reload()
+                self.assertEqual(app.config['TITLE'], 'lol')
+
+            # the app context keeps the configuration it saw first, with the
+            # content.
+            self.assertTrue(app.blohg.content is content)
+            self.assertEqual(app.config['TITLE'], title)
+        self.assertEqual(app.config['TITLE'], 'lol')
+        rv = app.test_client().get('/')
+        self.assertTrue(b'lol' in rv.data)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.cache
+    ~~~~~~~~~~~~~~~~~
+
+    Module with tests for the blohg render cache.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import os
+import sqlite3
+import unittest
+from flask import Flask
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from blohg.cache import RenderCache, render_key, RenderStore
+
+
+class RenderCacheTestCase(unittest.TestCase):
+
+    def test_get_and_set(self):
+        cache = RenderCache()
+        self.assertTrue(cache.get('foo') is None)
+        cache.set('foo', {'fragment': 'bar'})
+        self.assertEqual(cache.get('foo'), {'fragment': 'bar'})
+        self.assertTrue('foo' in cache)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_eviction(self):
+        cache = RenderCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertTrue('c' in cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_eviction_size(self):
+        value = {'fragment': 'x' * 1000}
+        cache = RenderCache(max_size=4000)
+        for key in 'abcd':
+            cache.set(key, dict(value))
+            cache.get('a')
+        self.assertTrue(cache.size() <= 4000)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertTrue('d' in cache)
+        self.assertEqual(cache.evictions, 1)
+        cache.set('e', {'fragment': 'x' * 10000})
+        self.assertEqual(len(cache), 1)
+        self.assertTrue('e' in cache)
+
+    def test_counters(self):
+        cache = RenderCache()
+        cache.get('foo')
+        cache.set('foo', {'fragment': 'bar'})
+        cache.get('foo')
+        cache.get('foo')
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (2, 1, 0))
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, cache.size()), (0, 0, 0))
+
+
+class RenderStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = mkdtemp()
+        self.filename = os.path.join(self.cache_dir, 'cache', 'render.sqlite')
+
+    def tearDown(self):
+        try:
+            rmtree(self.cache_dir)
+        except:
+            pass
+
+    def test_get_and_set(self):
+        store = RenderStore(self.filename)
+        self.assertTrue(store.get('foo') is None)
+        value = {'title': 'Foo', 'fragment': '<p>bar</p>',
+                 'first_paragraph_as_text': 'bar', 'images': ['a.png']}
+        store.set('foo', value)
+        self.assertEqual(store.get('foo'), value)
+
+        # a new store, like the ones created by other processes
+        self.assertEqual(RenderStore(self.filename).get('foo'), value)
+
+    def test_eviction(self):
+        store = RenderStore(self.filename, max_size=120)
+        store.atime_window = 0
+        store.set('a', 'a' * 40)
+        store.set('b', 'b' * 40)
+        self.assertEqual(store.get('a'), 'a' * 40)
+        store.set('c', 'c' * 40)
+        self.assertTrue(store.size() <= 90)
+        self.assertTrue(store.get('b') is None)
+        self.assertEqual(store.get('a'), 'a' * 40)
+        self.assertEqual(store.get('c'), 'c' * 40)
+
+    def test_eviction_batch(self):
+        store = RenderStore(self.filename, max_size=200)
+        for i in 'abcd':
+            store.set(i, i * 40)
+        store.set('e', 'e' * 40)
+        # evicted down to 3/4 of the budget, not just below it.
+        self.assertEqual([i for i in 'abcde' if store.get(i) is not None],
+                         ['c', 'd', 'e'])
+        self.assertEqual(store.size(), 3 * 42)
+
+    def test_size(self):
+        store = RenderStore(self.filename)
+        store.set('a', 'a' * 40)
+        store.set('b', 'b' * 40)
+        store.set('a', 'a' * 10)
+        self.assertEqual(store.size(), 12 + 42)
+        self.assertEqual(RenderStore(self.filename).size(), 12 + 42)
+
+    def test_lazy_atime(self):
+        store = RenderStore(self.filename)
+        store.set('a', 'a' * 40)
+        conn = sqlite3.connect(self.filename)
+        atime = conn.execute('SELECT atime FROM renders').fetchone()[0]
+        self.assertEqual(store.get('a'), 'a' * 40)
+        self.assertEqual(conn.execute('SELECT atime FROM renders')
+                         .fetchone()[0], atime)
+        store.atime_window = 0
+        self.assertEqual(store.get('a'), 'a' * 40)
+        self.assertTrue(conn.execute('SELECT atime FROM renders')
+                        .fetchone()[0] > atime)
+        conn.close()
+
+    def test_invalid_filename(self):
+        open(os.path.join(self.cache_dir, 'cache'), 'w').close()
+        store = RenderStore(self.filename)
+        store.set('foo', 'bar')
+        self.assertTrue(store.get('foo') is None)
+
+    def test_render_cache(self):
+        cache = RenderCache(store=RenderStore(self.filename))
+        cache.set('foo', 'bar')
+        cache = RenderCache(store=RenderStore(self.filename))
+        self.assertFalse('foo' in cache)
+        self.assertEqual(cache.get('foo'), 'bar')
+        self.assertTrue('foo' in cache)
+
+
+class RenderKeyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['ATTACHMENT_DIR'] = 'content/attachments'
+
+        class Blohg(object):
+            pass
+
+        self.app.blohg = Blohg()
+        self.app.blohg.content = []
+
+    def test_key(self):
+        key = render_key('foo', 3, ':repo:content/foo.rst')
+        self.assertEqual(key, render_key('foo', 3, ':repo:content/foo.rst'))
+        self.assertNotEqual(key, render_key('bar', 3,
+                                            ':repo:content/foo.rst'))
+        self.assertNotEqual(key, render_key('foo', 2,
+                                            ':repo:content/foo.rst'))
+        self.assertNotEqual(key, render_key('foo', 3,
+                                            ':repo:content/bar.rst'))
+        self.assertTrue(render_key('foo', 3, dependencies=True) is None)
+
+    def test_key_config(self):
+        with self.app.test_request_context('/', 'http://foo.com/'):
+            key = render_key('foo', 3)
+            self.app.config['ATTACHMENT_DIR'] = 'attachments'
+            self.assertNotEqual(key, render_key('foo', 3))
+        with self.app.test_request_context('/', 'http://bar.com/'):
+            self.assertNotEqual(key, render_key('foo', 3))
+            self.app.config['ATTACHMENT_DIR'] = 'content/attachments'
+            self.assertEqual(key, render_key('foo', 3))
+        with self.app.app_context():
+            self.assertEqual(key, render_key('foo', 3))
+
+    def test_key_extensions(self):
+        class ChangeCtx(object):
+            files = ['ext/blohg_foo.py', 'content/foo.rst']
+            ids = {'ext/blohg_foo.py': 'a', 'content/foo.rst': 'b'}
+
+            def file_id(self, fname):
+                return self.ids[fname]
+
+        with self.app.app_context():
+            key = render_key('foo', 3)
+            self.app.config['EXTENSIONS'] = ['foo']
+            self.assertNotEqual(key, render_key('foo', 3))
+            key = render_key('foo', 3)
+            self.app.config['EXTENSIONS_DIR'] = 'ext'
+            self.app.blohg.changectx = ChangeCtx()
+            self.assertNotEqual(key, render_key('foo', 3))
+            key = render_key('foo', 3)
+            ctx = ChangeCtx()
+            ctx.ids = {'ext/blohg_foo.py': 'a', 'content/foo.rst': 'c'}
+            self.app.blohg.changectx = ctx
+            self.assertEqual(key, render_key('foo', 3))
+            ctx = ChangeCtx()
+            ctx.ids = {'ext/blohg_foo.py': 'c', 'content/foo.rst': 'b'}
+            self.app.blohg.changectx = ctx
+            self.assertNotEqual(key, render_key('foo', 3))
+
+    def test_key_dependencies(self):
+        with self.app.app_context():
+            self.assertTrue(render_key('foo', 3, dependencies=True) is None)
+            self.app.blohg.content = type('Blog', (object,),
+                                          {'fingerprint': 'a'})()
+            key = render_key('foo', 3, dependencies=True)
+            self.assertTrue(key is not None)
+            self.assertNotEqual(key, render_key('foo', 3))
+            self.app.blohg.content.fingerprint = 'b'
+            self.assertNotEqual(key, render_key('foo', 3, dependencies=True))
+        with self.app.test_request_context('/', 'http://foo.com/'):
+            key = render_key('foo', 3, dependencies=True)
+        with self.app.test_request_context('/', 'http://bar.com/'):
+            self.assertNotEqual(key, render_key('foo', 3, dependencies=True))
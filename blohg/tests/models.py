@@ -10,18 +10,25 @@
 """
 
 import codecs
+import gc
 import time
 import unittest
 import os
+import weakref
 from datetime import datetime
 from mercurial import commands, hg, ui
 from shutil import rmtree
 from tempfile import mkdtemp
 
-from blohg.vcs_backends.hg.changectx import ChangeCtxDefault
+from blohg.vcs_backends.hg.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir
+from blohg.vcs_backends.fs.changectx import ChangeCtxDefault as \
+     FsChangeCtxDefault
 from blohg.vcs_backends.hg.filectx import FileCtx
 from blohg.vcs_backends.hg.utils import u2hg
-from blohg.models import Blog, Page, Post
+from blohg.cache import render_cache
+from blohg.models import Blog, Page, Post, scan_header
+from blohg.rst_parser import parser
 
 
 SAMPLE_PAGE = """\
@@ -97,6 +104,50 @@ class PageTestCase(unittest.TestCase):
         self.assertFalse(search_full in obj.abstract_html)
         self.assertFalse(search_full in obj.abstract_raw_html)
 
+    def test_render_cache(self):
+        from blohg import models
+        calls = []
+        _parser = models.parser
+
+        def parser(content, *args):
+            calls.append(content)
+            return _parser(content, *args)
+        models.parser = parser
+        try:
+            render_cache.clear()
+            obj = self._get_model(self.content)
+            self.assertTrue('abstract.' in obj.abstract_html)
+            self.assertEqual(len(calls), 1)
+            obj = self._get_model(self.content)
+            self.assertTrue('abstract.' in obj.abstract_html)
+            self.assertEqual(len(calls), 1)
+            obj = self._get_model(self.content + '\nlol\n')
+            self.assertTrue('lol' in obj.full_html)
+            self.assertEqual(len(calls), 2)
+        finally:
+            models.parser = _parser
+
+    def test_extension_dependencies(self):
+        from blohg import models
+        obj = self._get_model(self.content + '\n.. foo-bar:: lol\n')
+        self.assertFalse(obj.has_dependencies)
+        models.extension_directives.add('foo-bar')
+        try:
+            obj = self._get_model(self.content + '\n.. foo-bar:: lol\n')
+            self.assertTrue(obj.has_dependencies)
+        finally:
+            models.extension_directives.discard('foo-bar')
+        models.extension_roles.add('foo')
+        try:
+            obj = self._get_model(self.content + '\n:foo:`lol`\n')
+            self.assertTrue(obj.has_dependencies)
+            obj = self._get_model(self.content + '\n`lol`:foo:\n')
+            self.assertTrue(obj.has_dependencies)
+            obj = self._get_model(self.content + '\n:bar:`lol`\n')
+            self.assertFalse(obj.has_dependencies)
+        finally:
+            models.extension_roles.discard('foo')
+
     def test_fulltext(self):
         obj = self._get_model(self.content)
         search_abstract = 'abstract.'
@@ -176,6 +227,30 @@ class PageTestCase(unittest.TestCase):
         obj = self._get_model(self.content)
         self.assertEqual(obj.description, 'First paragraph.')
 
+    def test_title_description_not_parsed(self):
+        from blohg import models
+        _parser = models.parser
+        models.parser = None
+        try:
+            obj = self._get_model(self.content)
+            obj.title
+            obj.description
+        finally:
+            models.parser = _parser
+
+    def test_renderings_not_kept(self):
+        render_cache.clear()
+        obj = self._get_model(self.content)
+        self.assertTrue('content' in obj.full_raw_html)
+        self.assertTrue('abstract.' in obj.abstract_html)
+        for attr in ('parsed_source', 'parsed_abstract', 'full_raw_html',
+                     'abstract_html'):
+            self.assertFalse(attr in obj.__dict__)
+        misses = render_cache.misses
+        self.assertTrue('content' in obj.full_html)
+        self.assertEqual(render_cache.misses, misses)
+        render_cache.clear()
+
     def test_aliases(self):
         obj = self._get_model(self.content)
         self.assertEqual(obj.aliases, [])
@@ -199,6 +274,39 @@ class PostTestCase(PageTestCase):
         self.assertEqual(obj.tags, ['xd', 'lol', 'hehe'])
 
 
+class ScanHeaderTestCase(unittest.TestCase):
+
+    def assertScanned(self, content):
+        parsed = parser(content, 3)
+        self.assertEqual(scan_header(content),
+                         (parsed['title'], parsed['first_paragraph_as_text']))
+
+    def test_scan(self):
+        self.assertScanned(SAMPLE_PAGE)
+        self.assertScanned(SAMPLE_POST)
+        self.assertScanned('====\nFoo\n====\n\nbar\nbaz  \n\nlol')
+        self.assertScanned('.. comment\n   more\n\nFoo & <bar>\n'
+                           '===========\n\n"bar" http://example.org/')
+        self.assertScanned('Foo\n===\n\n.. tags: bar\n')
+        self.assertScanned('Foo bar_baz.\n\nBar\n===\n\nlol')
+        self.assertScanned('Foo\u00a0bar\n=======\n\nbaz\u00a0lol')
+        self.assertScanned('')
+
+    def test_fallback(self):
+        for content in ['Foo\n===\n\n- bar\n\nbaz',
+                        'Foo\n===\n\nbar **baz**',
+                        'Foo\n===\n\nbar::\n\n   baz',
+                        'Foo\n===\n\nbar\n   baz',
+                        'Foo\n===\n\n.. image:: bar.png\n\nbaz',
+                        'Foo\n===\n\nbar\n\nBaz\n===\n\nlol',
+                        'Foo\n===\n\nBar\n---\n\nbaz',
+                        '*Foo*\n=====\n\nbar',
+                        'Foo\n==\n\nbar',
+                        'Foo\n===\n\n\u2023 bar\n',
+                        'Foo\n===\n\n\u2043 bar\n']:
+            self.assertTrue(scan_header(content) is None, content)
+
+
 class BlogTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -248,6 +356,159 @@ class BlogTestCase(unittest.TestCase):
         except:
             pass
 
+    def test_lean(self):
+        model = self.get_model()
+        lean = Blog(ChangeCtxDefault(self.repo_path), 'content', '.rst', 3,
+                    lean=True)
+        for obj in model.get_all():
+            obj.title, obj.description, obj.read_more, obj.has_dependencies
+        self.assertTrue(lean.memory_usage() < model.memory_usage())
+        for obj in lean.get_all():
+            self.assertTrue(obj._source is None)
+            self.assertFalse('content' in obj._filectx.__dict__)
+            self.assertEqual(obj.full, model.get(obj.slug).full)
+            self.assertFalse('content' in obj._filectx.__dict__)
+            self.assertEqual(obj.description,
+                             model.get(obj.slug).description)
+            self.assertEqual(obj.full_raw_html,
+                             model.get(obj.slug).full_raw_html)
+        tags = [i.tags for i in model.get_all(True)]
+        for tag in tags[0]:
+            for other in tags[1:]:
+                for i in other:
+                    if i == tag:
+                        self.assertTrue(i is tag)
+
+    def test_get_page(self):
+        model = self.get_model()
+        posts = model.get_all(True)
+        for tag in [None, ['xd'], ['xd', 'lol']]:
+            if tag is not None:
+                posts = model.get_by_tag(tag)
+            self.assertEqual(model.get_page(1, 2, tag=tag),
+                             (posts[:2], (len(posts) + 1) // 2))
+            self.assertEqual(model.get_page(2, 2, tag=tag)[0], posts[2:4])
+            self.assertEqual(model.get_page(0, 2, tag=tag)[0], [])
+            self.assertEqual(model.get_page(10, 2, tag=tag)[0], [])
+        year = posts[0].datetime.year
+        self.assertEqual(model.get_page(1, 10, archive=year),
+                         (model.get_from_archive(year), 1))
+        self.assertEqual(model.get_page(1, 10, archive=1990), ([], 0))
+
+    def test_search(self):
+        model = self.get_model()
+        self.assertEqual([i.slug for i in model.search('bar')], ['post/foo'])
+        self.assertEqual(sorted([i.slug for i in model.search('hehe')]),
+                         ['post/post-%i' % i for i in range(3)])
+        self.assertEqual(model.search('page')[0].slug, 'post/foo')
+        self.assertEqual(model.search('trololo'), [])
+        index = model.search_index
+        file_path = os.path.join(self.repo_path, 'content', 'post', 'foo.rst')
+        with codecs.open(file_path, 'a', encoding='utf-8') as fp:
+            fp.write('\nTrololo\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        new_model = Blog(ChangeCtxDefault(self.repo_path), 'content', '.rst',
+                         3, model)
+        self.assertEqual([i.slug for i in new_model.search('trololo')],
+                         ['post/foo'])
+        self.assertEqual(model.search('trololo'), [])
+        self.assertTrue(new_model.search_index is not index)
+        self.assertEqual(len(new_model.search_index), 4)
+        # the new index shares the postings of the posts that didn't change.
+        self.assertTrue(new_model.search_index._postings['hehe'] is
+                        index._postings['hehe'])
+        self.assertTrue(new_model._search_index is None)
+
+    def test_reuse_releases_changectx(self):
+        # the file contexts of the plain filesystem backend keep their change
+        # contexts.
+        old_ctx = FsChangeCtxDefault(self.repo_path)
+        model = Blog(old_ctx, 'content', '.rst', 3)
+        about = model.get('about')
+        old_ref = weakref.ref(old_ctx)
+        file_path = os.path.join(self.repo_path, 'content', 'post', 'foo.rst')
+        with codecs.open(file_path, 'a', encoding='utf-8') as fp:
+            fp.write('\nTrololo\n')
+        new_model = Blog(FsChangeCtxDefault(self.repo_path), 'content',
+                         '.rst', 3, model)
+        self.assertTrue(new_model.get('about') is about)
+        self.assertTrue(about.full.startswith(SAMPLE_PAGE))
+        del model, old_ctx
+        gc.collect()
+        self.assertTrue(old_ref() is None)
+
+    def test_search_plain_text(self):
+        file_path = os.path.join(self.repo_path, 'content', 'post', 'foo.rst')
+        with codecs.open(file_path, 'a', encoding='utf-8') as fp:
+            fp.write('\n.. image:: trololo.png\n   :alt: lol\n\n'
+                     '.. sourcecode:: python\n   :linenos:\n\n'
+                     '   import os\n\nhttp://example.org/\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        from blohg import models
+        _parser = models.parser
+        model = self.get_model()
+        # the posts aren't rendered to build the index.
+        models.parser = None
+        try:
+            for query in ['image', 'trololo', 'png', 'sourcecode', 'linenos',
+                          'http', 'example', 'tags']:
+                self.assertEqual(model.search(query), [], query)
+            self.assertEqual([i.slug for i in model.search('import')],
+                             ['post/foo'])
+        finally:
+            models.parser = _parser
+
+    def test_warmup(self):
+        from blohg import models
+        _parser = models.parser
+        try:
+            for workers in [1, 2]:
+                render_cache.clear()
+                model = self.get_model()
+                # 8 pages/posts, with abstracts.
+                self.assertEqual(model.warmup(workers), 16)
+                self.assertEqual(model.warmup(workers), 0)
+                models.parser = None
+                for obj in model.get_all():
+                    self.assertTrue(obj.full_raw_html)
+                    self.assertTrue(obj.abstract_raw_html)
+                models.parser = _parser
+        finally:
+            models.parser = _parser
+            render_cache.clear()
+
+    def test_warmup_invalid_source(self):
+        file_path = os.path.join(self.repo_path, 'content', 'post', 'foo.rst')
+        with codecs.open(file_path, 'a', encoding='utf-8') as fp:
+            fp.write('\nA\n#\n\nlol\n\nB\n^\n\nlol\n\nC\n"\n\nlol\n\n'
+                     'D\n#\n\nlol\n\nE\n"\n\nlol\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        try:
+            for workers in [1, 2]:
+                render_cache.clear()
+                model = self.get_model()
+                foo = model.get('post/foo')
+                with self.assertRaises(Exception):
+                    parser(foo.full, 3)
+                # the abstract of the post is still valid.
+                self.assertEqual(model.warmup(workers), 15)
+                self.assertFalse(foo._render_key(foo.full) in render_cache)
+        finally:
+            render_cache.clear()
+
+    def test_warmup_limit(self):
+        try:
+            render_cache.clear()
+            model = self.get_model()
+            self.assertEqual(model.warmup(1, 3), 3)
+            self.assertEqual(len(render_cache), 3)
+            newest = model.get_all()[0]
+            self.assertTrue(newest._render_key(newest.full) in render_cache)
+            self.assertEqual(model.warmup(1, 0), 0)
+            self.assertEqual(model.warmup(1), 13)
+        finally:
+            render_cache.clear()
+
     def test_tags(self):
         self.assertEqual(sorted(self.get_model().tags),
                          sorted(['bar', 'foo', 'hehe', 'lol', 'xd']))
@@ -259,6 +520,84 @@ class BlogTestCase(unittest.TestCase):
 
     def test_get(self):
         self.assertEqual(self.get_model().get('about').slug, 'about')
+        self.assertTrue(self.get_model().get('lol') is None)
+
+    def test_get_same_slug(self):
+        file_dir = os.path.join(self.repo_path, 'content', 'about')
+        os.makedirs(file_dir)
+        file_path = os.path.join(file_dir, 'index.rst')
+        with codecs.open(file_path, 'w', encoding='utf-8') as fp:
+            fp.write(SAMPLE_PAGE + """
+.. date: """ + str(int(time.time()) + 2))
+        commands.commit(self.ui, self.repo, u2hg(file_path), user=b'foo',
+                        message=b'foo', addremove=True)
+        model = self.get_model()
+        self.assertEqual(model.get('about').path, 'content/about.rst')
+        time.sleep(2)
+        self.assertEqual(model.get('about').path, 'content/about/index.rst')
+
+    def test_load_time(self):
+        model = self.get_model()
+        self.assertTrue(model.load_time >= 0)
+        self.assertTrue(model.get('about').full.startswith(SAMPLE_PAGE))
+
+    def test_previous(self):
+        model = Blog(ChangeCtxWorkingDir(self.repo_path), 'content', '.rst', 3)
+        file_path = os.path.join(self.repo_path, 'content', 'page-1.rst')
+        with codecs.open(file_path, 'a', encoding='utf-8') as fp:
+            fp.write('\nlol\n')
+        new_model = Blog(ChangeCtxWorkingDir(self.repo_path), 'content',
+                         '.rst', 3, model)
+        self.assertTrue(new_model.get('page-0') is model.get('page-0'))
+        self.assertTrue(new_model.get('about') is model.get('about'))
+        self.assertFalse(new_model.get('page-1') is model.get('page-1'))
+        self.assertTrue(new_model.get('page-1').full.endswith('\nlol\n'))
+        self.assertEqual(new_model.tags, model.tags)
+        self.assertEqual(new_model.aliases, model.aliases)
+
+    def test_previous_revision(self):
+        model = self.get_model()
+        file_dir = os.path.join(self.repo_path, 'content', 'post')
+        with codecs.open(os.path.join(file_dir, 'foo.rst'), 'w',
+                         encoding='utf-8') as fp:
+            fp.write(SAMPLE_PAGE + """
+.. tags: foo, lol, new
+.. date: 2010-01-01 00:00:00""")
+        with codecs.open(os.path.join(self.repo_path, 'content',
+                                      'about.rst'), 'w',
+                         encoding='utf-8') as fp:
+            fp.write(SAMPLE_PAGE)
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        loaded = []
+        ctx = ChangeCtxDefault(self.repo_path)
+        get_contents = ctx.get_contents
+        ctx.get_contents = lambda paths: loaded.extend(paths) or \
+            get_contents(paths)
+        new_model = Blog(ctx, 'content', '.rst', 3, model)
+        self.assertEqual(sorted(loaded), ['content/about.rst',
+                                          'content/post/foo.rst'])
+        self.assertTrue(new_model.get('page-0') is model.get('page-0'))
+        self.assertTrue(new_model.get('post/post-1') is
+                        model.get('post/post-1'))
+        self.assertFalse(new_model.get('post/foo') is model.get('post/foo'))
+        self.assertEqual(new_model.aliases, {})
+        full_model = self.get_model()
+        for attr in ['tags', 'archives', 'aliases']:
+            self.assertEqual(getattr(new_model, attr),
+                             getattr(full_model, attr))
+        self.assertEqual(new_model.tags, ['foo', 'hehe', 'lol', 'new', 'xd'])
+        self.assertTrue((2010, 1) in new_model.archives)
+        self.assertEqual([i.path for i in new_model.get_all()],
+                         [i.path for i in full_model.get_all()])
+
+    def test_fingerprint(self):
+        fingerprint = self.get_model().fingerprint
+        self.assertEqual(fingerprint, self.get_model().fingerprint)
+        file_path = os.path.join(self.repo_path, 'content', 'page-1.rst')
+        with codecs.open(file_path, 'a', encoding='utf-8') as fp:
+            fp.write('\nlol\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        self.assertNotEqual(fingerprint, self.get_model().fingerprint)
 
     def test_get_all(self):
         self.assertEqual(sorted([i.slug for i in self.get_model().get_all()]),
@@ -279,6 +618,17 @@ class BlogTestCase(unittest.TestCase):
                                 ['post/foo']))
         self.assertEqual(sorted([i.slug for i in \
                                  model.get_by_tag('foo')]), ['post/foo'])
+        self.assertEqual([i.slug for i in model.get_by_tag(['lol', 'bar'])],
+                         ['post/foo'])
+        self.assertEqual(model.get_by_tag(['lol', 'xd', 'foo']), [])
+        self.assertEqual(model.get_by_tag(['lol', 'lolz']), [])
+        self.assertEqual([i.slug for i in model.get_by_tag(['lol', 'xd'])],
+                         [i.slug for i in model.get_by_tag('hehe')])
+        self.assertEqual(model.get_by_tag([]), model.get_all(True))
+
+    def test_tag_set(self):
+        model = self.get_model()
+        self.assertEqual(model.tag_set, frozenset(model.tags))
 
     def test_get_from_archive(self):
         file_dir = os.path.join(self.repo_path, 'content', 'post')
@@ -303,6 +653,10 @@ class BlogTestCase(unittest.TestCase):
         self.assertEqual(mar_2010[0].slug, 'post/archive-3')
         apr_2010 = model.get_from_archive(2010, 4)
         self.assertEqual(len(apr_2010), 0)
+        self.assertEqual([i.slug for i in model.get_from_archive(2010)],
+                         ['post/archive-3', 'post/archive-2',
+                          'post/archive-1'])
+        self.assertEqual(model.get_from_archive(2009), [])
 
     def test_self(self):
         self.assertEqual(sorted([i.slug for i in self.get_model().published]),
@@ -322,5 +676,14 @@ class BlogTestCase(unittest.TestCase):
                         message=b'foo', addremove=True)
         model = self.get_model()
         self.assertEqual(model.get('post/scheduled'), None)
+        scheduled = model._all[0]
+        self.assertEqual(model._publication, (1, scheduled.date))
+        self.assertFalse(scheduled in model.get_all(True))
+        self.assertFalse(scheduled in model.get_by_tag(scheduled.tags))
         time.sleep(2)
         self.assertEqual(model.get('post/scheduled').slug, 'post/scheduled')
+        self.assertEqual(model._publication, (0, None))
+        self.assertEqual(model.get_all(True)[0], scheduled)
+        self.assertEqual(model.get_by_tag(scheduled.tags)[0], scheduled)
+        self.assertEqual(model.get_from_archive(scheduled.datetime.year)[0],
+                         scheduled)
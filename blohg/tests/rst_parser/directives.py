@@ -193,7 +193,8 @@ class AttachmentImageTestCase(DirectiveTestCase):
                                        mock.MagicMock())
         self.current_app = self._current_app.start()
         self.current_app.config = {'ATTACHMENT_DIR': 'content/att'}
-        self.current_app.blohg.changectx.files = ['content/att/foo.jpg']
+        self.current_app.blohg.changectx.file_set = \
+            frozenset(['content/att/foo.jpg'])
         self._url_for = mock.patch('blohg.rst_parser.directives.url_for')
         self.url_for = self._url_for.start()
         self.url_for.return_value = 'http://lol/foo.jpg'
@@ -241,7 +242,8 @@ class AttachmentFigureTestCase(DirectiveTestCase):
                                        mock.MagicMock())
         self.current_app = self._current_app.start()
         self.current_app.config = {'ATTACHMENT_DIR': 'content/att'}
-        self.current_app.blohg.changectx.files = ['content/att/foo.jpg']
+        self.current_app.blohg.changectx.file_set = \
+            frozenset(['content/att/foo.jpg'])
         self._url_for = mock.patch('blohg.rst_parser.directives.url_for')
         self.url_for = self._url_for.start()
         self.url_for.return_value = 'http://lol/foo.jpg'
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.search
+    ~~~~~~~~~~~~~~~~~~
+
+    Module with tests for the full-text search index.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import unittest
+
+from blohg.search import SearchIndex, plain_text, tokenize
+
+
+class SearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add('a', [('Hello World', 3), ('foo bar', 1)])
+        self.index.add('b', [('Lorem ipsum', 3), ('hello, lorem ipsum', 1)])
+        self.index.add('c', [('Ação', 3), ('lorem', 1)])
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Hello, World! ``Ação``_ foo_bar'),
+                         ['hello', 'world', 'ação', 'foo', 'bar'])
+
+    def test_plain_text(self):
+        source = (
+            'Title\n=====\n\n.. tags: foo, bar\n\n'
+            'Some *text*, with a `link <http://example.org/>`_,\n'
+            'a :ref:`role <target>` and http://example.com/.\n\n'
+            '.. image:: image.png\n   :alt: lol\n\n'
+            '.. note:: note\n\n   The content of the note.\n\n'
+            '.. raw:: html\n\n   <div class="lol"></div>\n\n'
+            '.. _target: http://example.net/\n\n'
+            '.. |sub| replace:: substitution\n\n'
+            '.. a comment\n   still a comment\n\n'
+            '.. [1] A footnote.\n\nThe end.\n')
+        self.assertEqual(tokenize(plain_text(source)),
+                         ['title', 'some', 'text', 'with', 'a', 'link',
+                          'a', 'role', 'and', 'the', 'content', 'of', 'the',
+                          'note', 'a', 'footnote', 'the', 'end'])
+
+    def test_search(self):
+        self.assertEqual([i[1] for i in self.index.search('hello')],
+                         ['a', 'b'])
+        self.assertEqual([i[1] for i in self.index.search('LOREM')],
+                         ['b', 'c'])
+        self.assertEqual([i[1] for i in self.index.search('ação')], ['c'])
+        self.assertEqual(self.index.search('xd'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_remove(self):
+        self.index.remove('a')
+        self.index.remove('d')
+        self.assertEqual(len(self.index), 2)
+        self.assertFalse('a' in self.index)
+        self.assertEqual([i[1] for i in self.index.search('hello')], ['b'])
+        self.assertFalse('world' in self.index._postings)
+
+    def test_previous(self):
+        index = SearchIndex(self.index)
+        index.add('a', [('Bye', 1)])
+        self.assertEqual([i[1] for i in index.search('hello')], ['b'])
+        self.assertEqual([i[1] for i in self.index.search('hello')],
+                         ['a', 'b'])
+        self.assertEqual([i[1] for i in index.search('bye')], ['a'])
+
+    def test_previous_shared(self):
+        index = SearchIndex(self.index)
+        index.remove('c')
+        # the postings of the words of the removed document are copied, the
+        # others are shared.
+        self.assertTrue(index._postings['hello'] is
+                        self.index._postings['hello'])
+        self.assertFalse(index._postings['lorem'] is
+                         self.index._postings['lorem'])
+        self.assertFalse('ação' in index._postings)
+        self.assertEqual(sorted(self.index._postings['lorem']), ['b', 'c'])
+        index.add('d', [('hello', 1)])
+        self.assertEqual(sorted(index._postings['hello']), ['a', 'b', 'd'])
+        self.assertEqual(sorted(self.index._postings['hello']), ['a', 'b'])
@@ -9,14 +9,18 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
+import subprocess
+import sys
+import threading
 import unittest
 from pygit2 import init_repository
 from shutil import rmtree
 from tempfile import mkdtemp
 
+from blohg.vcs_backends.fs import FsRepository
 from blohg.vcs_backends.hg import HgRepository
 from blohg.vcs_backends.git import GitRepository
-from blohg.vcs import load_repo
+from blohg.vcs import load_repo, RepositoryPool
 
 
 class LoadRepoTestCase(unittest.TestCase):
@@ -45,6 +49,50 @@ class LoadRepoTestCase(unittest.TestCase):
         repo = load_repo(self.repo_path)
         self.assertTrue(isinstance(repo, GitRepository))
 
+    def test_load_fs_repository(self):
+        FsRepository.create_repo(self.repo_path)
+        repo = load_repo(self.repo_path)
+        self.assertTrue(isinstance(repo, FsRepository))
+
+    def test_load_imports_marked_backend(self):
+        FsRepository.create_repo(self.repo_path)
+        code = ('import sys; from blohg.vcs import load_repo; '
+                'load_repo(sys.argv[1]); '
+                'print(sorted(i for i in sys.modules if i in ("mercurial", '
+                '"pygit2")))')
+        output = subprocess.check_output([sys.executable, '-c', code,
+                                          self.repo_path])
+        self.assertEqual(output.strip(), b'[]')
+
     def test_no_backend(self):
         with self.assertRaises(RuntimeError):
             load_repo(self.repo_path)
+
+
+class RepositoryPoolTestCase(unittest.TestCase):
+
+    def test_get(self):
+        pool = RepositoryPool()
+        opened = []
+
+        def factory(path):
+            opened.append(path)
+            return object()
+
+        handle = pool.get('foo', '/bar', factory)
+        self.assertTrue(pool.get('foo', '/bar', factory) is handle)
+        self.assertFalse(pool.get('foo', '/baz', factory) is handle)
+        self.assertFalse(pool.get('bar', '/bar', factory) is handle)
+        self.assertEqual(opened, ['/bar', '/baz', '/bar'])
+        pool.clear()
+        self.assertFalse(pool.get('foo', '/bar', factory) is handle)
+
+    def test_thread_local(self):
+        pool = RepositoryPool()
+        handle = pool.get('foo', '/bar', lambda path: object())
+        rv = []
+        thread = threading.Thread(target=lambda: rv.append(
+            pool.get('foo', '/bar', lambda path: object())))
+        thread.start()
+        thread.join()
+        self.assertFalse(rv[0] is handle)
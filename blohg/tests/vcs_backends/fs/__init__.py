@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.vcs_backends.fs
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Package with tests for blohg integration with plain directory trees.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import os
+import unittest
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from blohg.vcs_backends.fs import FsRepository
+from blohg.vcs_backends.fs.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir
+from blohg.vcs import REVISION_DEFAULT, REVISION_WORKING_DIR
+
+
+class FsRepositoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_path = mkdtemp()
+
+    def tearDown(self):
+        try:
+            rmtree(self.repo_path)
+        except:
+            pass
+
+    def test_create_repo(self):
+        repo_path = os.path.join(self.repo_path, 'repo')
+        FsRepository.create_repo(repo_path)
+        for f in [os.path.join('content', 'post', 'example-post.rst'),
+                  os.path.join('content', 'about.rst'),
+                  os.path.join('templates', 'base.html'),
+                  'config.yaml', '.blohg-reload']:
+            self.assertTrue(os.path.exists(os.path.join(repo_path, f)),
+                            'Not found: %s' % f)
+        self.assertTrue(FsRepository.supported(repo_path))
+        with self.assertRaises(RuntimeError):
+            FsRepository.create_repo(repo_path)
+
+    def test_supported(self):
+        self.assertFalse(FsRepository.supported(self.repo_path))
+        open(os.path.join(self.repo_path, 'config.yaml'), 'w').close()
+        self.assertTrue(FsRepository.supported(self.repo_path))
+        for d in ['.hg', '.git']:
+            os.mkdir(os.path.join(self.repo_path, d))
+            self.assertFalse(FsRepository.supported(self.repo_path))
+            os.rmdir(os.path.join(self.repo_path, d))
+
+    def test_get_changectx(self):
+        repo = FsRepository(self.repo_path)
+        self.assertTrue(isinstance(repo.get_changectx(REVISION_DEFAULT),
+                                   ChangeCtxDefault))
+        self.assertTrue(isinstance(repo.get_changectx(REVISION_WORKING_DIR),
+                                   ChangeCtxWorkingDir))
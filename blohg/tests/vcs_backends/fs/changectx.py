@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.vcs_backends.fs.changectx
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Module with tests for blohg integration with plain directory trees
+    (change context).
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import codecs
+import json
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import sleep, time
+
+from blohg.vcs_backends.fs.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir, MANIFEST_FILE, MARKER_FILE
+
+
+class ChangeCtxBaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_path = mkdtemp()
+        self.repo_files = ['a%i.rst' % i for i in range(5)] + \
+            ['content/post/b.rst']
+        os.makedirs(os.path.join(self.repo_path, 'content', 'post'))
+        os.makedirs(os.path.join(self.repo_path, '.hidden'))
+        for i in self.repo_files + ['.hidden/c.rst']:
+            self.write(i, 'dumb file %s\n' % i)
+        self.touch()
+
+    def tearDown(self):
+        try:
+            rmtree(self.repo_path)
+        except:
+            pass
+
+    def write(self, path, content, mode='w'):
+        with codecs.open(os.path.join(self.repo_path, path), mode,
+                         encoding='utf-8') as fp:
+            fp.write(content)
+
+    def touch(self):
+        marker = os.path.join(self.repo_path, MARKER_FILE)
+        open(marker, 'a').close()
+        st = os.stat(marker)
+        os.utime(marker, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+    @property
+    def ctx_class(self):
+        raise NotImplementedError
+
+    def get_ctx(self):
+        return self.ctx_class(self.repo_path)
+
+
+class ChangeCtxDefaultTestCase(ChangeCtxBaseTestCase):
+
+    ctx_class = ChangeCtxDefault
+
+    def test_files(self):
+        ctx = self.get_ctx()
+        self.assertEqual(ctx.files, sorted(self.repo_files))
+        self.assertEqual(ctx.get_filectx('content/post/b.rst').content,
+                         'dumb file content/post/b.rst\n')
+        with self.assertRaises(RuntimeError):
+            ctx.get_filectx('.hidden/c.rst')
+
+    def test_manifest(self):
+        with open(os.path.join(self.repo_path, MANIFEST_FILE), 'w') as fp:
+            json.dump({'a0.rst': {'date': 1234567890, 'mdate': 1234567900,
+                                  'author': 'foo <foo@example.com>'}}, fp)
+        ctx = self.get_ctx()
+        filectx = ctx.get_filectx('a0.rst')
+        self.assertEqual(filectx.date, 1234567890)
+        self.assertEqual(filectx.mdate, 1234567900)
+        self.assertEqual(filectx.author, 'foo <foo@example.com>')
+        filectx = ctx.get_filectx('a1.rst')
+        self.assertEqual(filectx.date, int(os.stat(os.path.join(
+            self.repo_path, 'a1.rst')).st_mtime))
+        self.assertTrue(filectx.mdate is None)
+        self.assertTrue(filectx.author is None)
+
+    def test_needs_reload(self):
+        ctx = self.get_ctx()
+        filectx = ctx.get_filectx('a0.rst')
+        self.assertFalse(ctx.needs_reload())
+        self.assertFalse(ctx.filectx_needs_reload(filectx))
+
+        # files changed, but the marker wasn't touched
+        self.write('a0.rst', 'lol\n', 'a')
+        self.write('a.rst', 'lol\n')
+        self.assertFalse(ctx.needs_reload())
+
+        self.touch()
+        self.assertTrue(ctx.needs_reload())
+        self.assertTrue(ctx.filectx_needs_reload(filectx))
+
+        ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
+        self.assertTrue('a.rst' in ctx.files)
+
+    def test_filectx_needs_reload(self):
+        old_ctx = self.get_ctx()
+        filectx = old_ctx.get_filectx('a0.rst')
+        unchanged = old_ctx.get_filectx('a1.rst')
+        self.write('a0.rst', 'lol\n', 'a')
+        self.touch()
+
+        # the change context was replaced, like before a request.
+        ctx = self.get_ctx()
+        self.assertTrue(ctx.filectx_needs_reload(filectx))
+        self.assertFalse(ctx.filectx_needs_reload(unchanged))
+        self.assertFalse(ctx.filectx_needs_reload(ctx.get_filectx('a0.rst')))
+
+    def test_file_id(self):
+        ctx = self.get_ctx()
+        file_id = ctx.file_id('a0.rst')
+        self.assertTrue(file_id is not None)
+        self.assertTrue(ctx.file_id('a.rst') is None)
+        self.write('a0.rst', 'lol\n', 'a')
+        self.assertNotEqual(self.get_ctx().file_id('a0.rst'), file_id)
+
+    def test_published(self):
+        ctx = self.get_ctx()
+        date = int(time() + 1)
+        self.assertFalse(ctx.published(date, time()))
+        sleep(1)
+        self.assertTrue(ctx.published(date, time()))
+
+
+class ChangeCtxWorkingDirTestCase(ChangeCtxBaseTestCase):
+
+    ctx_class = ChangeCtxWorkingDir
+
+    def test_needs_reload(self):
+        ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
+
+        self.write('a0.rst', 'lol\n', 'a')
+        self.assertTrue(ctx.needs_reload())
+
+        ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
+
+        self.write('content/post/a.rst', 'lol\n')
+        self.assertTrue(ctx.needs_reload())
+
+    def test_published(self):
+        ctx = self.get_ctx()
+        date = int(time() + 1)
+        self.assertTrue(ctx.published(date, time()))
@@ -83,6 +83,40 @@ class ChangeCtxDefaultTestCase(ChangeCtxBaseTestCase):
             self.assertTrue(f in ctx.files, 'file not found in stable '
                             'state: %s' % f)
 
+    def test_files_from_subtrees(self):
+        new_files = ['content/a-b.rst', 'content/post/b.rst',
+                     'content/post/c.rst']
+        os.makedirs(os.path.join(self.repo_path, 'content', 'post'))
+        for f in new_files:
+            with codecs.open(os.path.join(self.repo_path, f), 'w',
+                             encoding='utf-8') as fp:
+                fp.write('testing %s\n' % f)
+            self.repo.index.add(f)
+        self.repo.index.write()
+        self.repo.create_commit('refs/heads/master', self.sign, self.sign,
+                                'foo', self.repo.index.write_tree(),
+                                [self.old_commit])
+        ctx = self.get_ctx()
+        self.assertEqual(ctx.files, sorted(self.repo_files + new_files))
+        self.assertEqual(ctx.file_set, frozenset(self.repo_files + new_files))
+        self.assertEqual(ctx.get_filectx('content/post/c.rst').content,
+                         'testing content/post/c.rst\n')
+
+    def test_get_contents(self):
+        ctx = self.get_ctx()
+        contents = ctx.get_contents(self.repo_files[:3])
+        self.assertEqual(sorted(contents.keys()), self.repo_files[:3])
+        for f in self.repo_files[:3]:
+            self.assertEqual(contents[f], 'dumb file %s\n' % f)
+            self.assertEqual(contents[f], ctx.get_filectx(f).content)
+
+    def test_file_id(self):
+        ctx = self.get_ctx()
+        self.assertEqual(ctx.file_id('a0.rst'),
+                         self.repo[self.old_commit].tree['a0.rst'].oid)
+        self.assertNotEqual(ctx.file_id('a0.rst'), ctx.file_id('a1.rst'))
+        self.assertTrue(ctx.file_id('a.rst') is None)
+
     def test_needs_reload(self):
         ctx = self.get_ctx()
         self.assertFalse(ctx.needs_reload())
@@ -181,27 +215,48 @@ class ChangeCtxWorkingDirTestCase(ChangeCtxBaseTestCase):
 
     def test_needs_reload(self):
         ctx = self.get_ctx()
-        self.assertTrue(ctx.needs_reload())
+        self.assertFalse(ctx.needs_reload())
 
         # add a file to repo
         with codecs.open(os.path.join(self.repo_path, 'a.rst'), 'w',
                          encoding='utf-8') as fp:
             fp.write('testing\n')
 
-        # should always be true
+        # should need a reload now, the directory changed
         self.assertTrue(ctx.needs_reload())
 
-        git_commit(self.repo, self.tree, ['a.rst'], [self.old_commit])
+        # reload
+        ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
 
-        # should need a reload now, after the commit
+        # change a tracked file
+        with codecs.open(os.path.join(self.repo_path, 'a0.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+
+        # should need a reload now, after the change
         self.assertTrue(ctx.needs_reload())
 
         # reload
         ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
 
-        # should still need a reload, right after the reload
+        git_commit(self.repo, self.tree, ['a.rst'], [self.old_commit])
+
+        # should need a reload now, after the commit
         self.assertTrue(ctx.needs_reload())
 
+    def test_file_id(self):
+        ctx = self.get_ctx()
+        file_id = ctx.file_id('a0.rst')
+        self.assertTrue(file_id is not None)
+        self.assertTrue(ctx.file_id('a.rst') is None)
+        with codecs.open(os.path.join(self.repo_path, 'a0.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+        ctx = self.get_ctx()
+        self.assertNotEqual(ctx.file_id('a0.rst'), file_id)
+
     def test_filectx_needs_reload(self):
 
         # add a file to repo
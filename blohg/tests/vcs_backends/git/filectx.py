@@ -13,7 +13,7 @@ import codecs
 import os
 import time
 import unittest
-from pygit2 import init_repository, Repository
+from pygit2 import Blob, init_repository, Repository, Signature
 from shutil import rmtree
 from tempfile import mkdtemp
 
@@ -61,6 +61,52 @@ class FileCtxTestCase(unittest.TestCase):
         ctx = FileCtx(self.repo, self.changectx, self.file_name, True)
         self.assertEqual(ctx.content, 'test\nlol\n')
 
+    def test_lazy_blob(self):
+        oid = self.repo.head.peel().tree[self.file_name].oid
+        ctx = FileCtx(self.repo, self.changectx, self.file_name)
+        self.assertEqual(ctx._oid, oid)
+        ctx = FileCtx(self.repo, self.changectx, self.file_name, oid=oid)
+        self.assertFalse(any(isinstance(i, Blob)
+                             for i in ctx.__dict__.values()))
+        self.assertEqual(ctx.content, 'test\n')
+        ctx.release()
+        self.assertFalse('data' in ctx.__dict__)
+        self.assertFalse('content' in ctx.__dict__)
+        self.assertEqual(ctx.content, 'test\n')
+
+    def test_invalid_file(self):
+        self.assertRaises(RuntimeError, FileCtx, self.repo, self.changectx,
+                          'bar.rst')
+
+    def test_tree_cache(self):
+        files = ['content/post/a.rst', 'content/post/b.rst', 'content/c.rst']
+        os.makedirs(os.path.join(self.repo_path, 'content', 'post'))
+        for f in files:
+            with codecs.open(os.path.join(self.repo_path, f), 'w',
+                             encoding='utf-8') as fp:
+                fp.write('test %s\n' % f)
+            self.repo.index.add(f)
+        self.repo.index.write()
+        sign = Signature('foo', 'foo@example.com')
+        commit = self.repo[self.repo.create_commit(
+            'refs/heads/master', sign, sign, 'foo',
+            self.repo.index.write_tree(), [self.last_commit])]
+        tree_cache = {}
+        for f in files:
+            ctx = FileCtx(self.repo, commit, f, tree_cache=tree_cache)
+            self.assertEqual(ctx.content, 'test %s\n' % f)
+        tree = commit.tree
+        self.assertEqual(sorted(i[1] for i in tree_cache),
+                         ['content', 'content/post'])
+        self.assertEqual(tree_cache[(tree.oid, 'content/post')].oid,
+                         tree['content']['post'].oid)
+        ctx = FileCtx(self.repo, commit, 'content/post/a.rst',
+                      tree_cache=tree_cache)
+        self.assertTrue(ctx.get_fileobj_from_basetree(
+            tree, 'content/post/d.rst') is None)
+        self.assertTrue(ctx.get_fileobj_from_basetree(
+            tree, 'content/c.rst/d.rst') is None)
+
     def test_author(self):
         ctx = FileCtx(self.repo, self.changectx, self.file_name)
         self.assertEqual(ctx.author, 'foo <foo@example.com>')
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.vcs_backends.git.history
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Module with tests for blohg integration with git (history index).
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import codecs
+import json
+import os
+import unittest
+from pygit2 import init_repository, Repository, Signature
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from blohg.vcs_backends.git.history import HistoryIndex
+
+
+class HistoryIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_path = mkdtemp()
+        init_repository(self.repo_path, False)
+        self.repo = Repository(self.repo_path)
+        self.parents = []
+        self.timestamp = 1234567890
+
+    def tearDown(self):
+        try:
+            rmtree(self.repo_path)
+        except:
+            pass
+
+    def commit(self, files, author='foo', ref='refs/heads/master'):
+        for f, content in files.items():
+            full_path = os.path.join(self.repo_path, f)
+            if not os.path.isdir(os.path.dirname(full_path)):
+                os.makedirs(os.path.dirname(full_path))
+            with codecs.open(full_path, 'w', encoding='utf-8') as fp:
+                fp.write(content)
+            self.repo.index.add(f)
+        self.repo.index.write()
+        self.timestamp += 10
+        sign = Signature(author, '%s@example.com' % author, self.timestamp, 0)
+        oid = self.repo.create_commit(ref, sign, sign, 'foo',
+                                      self.repo.index.write_tree(),
+                                      self.parents)
+        self.parents = [oid]
+        return oid
+
+    def test_first_and_last_commits(self):
+        c1 = self.commit({'a.rst': 'a', 'content/post/b.rst': 'b'})
+        c2 = self.commit({'content/post/c.rst': 'c'}, author='bar')
+        c3 = self.commit({'content/post/b.rst': 'b2'}, author='bar')
+        index = HistoryIndex(self.repo)
+        self.assertEqual(len(index), 3)
+        a = index.get('a.rst')
+        self.assertEqual(a.first, c1.hex)
+        self.assertEqual(a.last, c1.hex)
+        self.assertEqual(a.date, 1234567900)
+        self.assertTrue(a.mdate is None)
+        self.assertEqual(a.author, 'foo <foo@example.com>')
+        b = index.get('content/post/b.rst')
+        self.assertEqual(b.first, c1.hex)
+        self.assertEqual(b.last, c3.hex)
+        self.assertEqual(b.date, 1234567900)
+        self.assertEqual(b.mdate, 1234567920)
+        self.assertEqual(b.author, 'foo <foo@example.com>')
+        c = index.get('content/post/c.rst')
+        self.assertEqual(c.first, c2.hex)
+        self.assertEqual(c.author, 'bar <bar@example.com>')
+        self.assertTrue(index.get('content/post') is None)
+        self.assertFalse('d.rst' in index)
+
+    def test_unchanged_content(self):
+        self.commit({'a.rst': 'a'})
+        self.commit({'a.rst': 'a', 'b.rst': 'b'})
+        index = HistoryIndex(self.repo)
+        self.assertTrue(index.get('a.rst').mdate is None)
+
+    def test_merge(self):
+        c1 = self.commit({'a.rst': 'a'})
+        c2 = self.commit({'b.rst': 'b'})
+        self.parents = [c1]
+        self.repo.index.read_tree(self.repo[c1].tree)
+        c3 = self.commit({'c.rst': 'c'}, ref=None)
+        self.parents = [c2, c3]
+        self.repo.index.add('b.rst')
+        self.commit({})
+        index = HistoryIndex(self.repo)
+        self.assertEqual(index.get('a.rst').last, c1.hex)
+        self.assertEqual(index.get('b.rst').last, c2.hex)
+        self.assertEqual(index.get('c.rst').last, c3.hex)
+
+    def test_cache_file(self):
+        cache_file = os.path.join(self.repo_path, 'history.json')
+        c1 = self.commit({'a.rst': 'a'})
+        index = HistoryIndex(self.repo, cache_file=cache_file)
+        self.assertEqual(index.tip, c1.hex)
+        with open(cache_file) as fp:
+            self.assertEqual(json.load(fp)['tip'], c1.hex)
+        c2 = self.commit({'a.rst': 'a2', 'b.rst': 'b'})
+        walked = []
+        _walk = HistoryIndex._walk
+
+        def walk(self, tip, since=None):
+            for rv in _walk(self, tip, since):
+                walked.append(rv[0])
+                yield rv
+        HistoryIndex._walk = walk
+        try:
+            index = HistoryIndex(self.repo, cache_file=cache_file)
+            self.assertEqual(walked, [c2.hex])
+            del walked[:]
+            index = HistoryIndex(self.repo, cache_file=cache_file)
+            self.assertEqual(walked, [])
+        finally:
+            HistoryIndex._walk = _walk
+        self.assertEqual(index.tip, c2.hex)
+        self.assertEqual(index.get('a.rst').first, c1.hex)
+        self.assertEqual(index.get('a.rst').last, c2.hex)
+        self.assertEqual(index.get('b.rst').first, c2.hex)
+
+    def test_no_branch(self):
+        index = HistoryIndex(self.repo)
+        self.assertTrue(index.tip is None)
+        self.assertEqual(len(index), 0)
@@ -88,6 +88,20 @@ class ChangeCtxDefaultTestCase(ChangeCtxBaseTestCase):
             self.assertTrue(f in ctx.files, 'file not found in stable '
                             'state: %s' % f)
 
+    def test_file_id(self):
+        ctx = self.get_ctx()
+        file_id = ctx.file_id('a0.rst')
+        self.assertEqual(file_id, ctx.get_filectx('a0.rst')._ctx.filenode())
+        self.assertTrue(ctx.file_id('a.rst') is None)
+        old_file_id = ctx.file_id('a1.rst')
+        with codecs.open(os.path.join(self.repo_path, 'a1.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        ctx = self.get_ctx()
+        self.assertEqual(ctx.file_id('a0.rst'), file_id)
+        self.assertNotEqual(ctx.file_id('a1.rst'), old_file_id)
+
     def test_needs_reload(self):
         ctx = self.get_ctx()
         self.assertFalse(ctx.needs_reload())
@@ -112,6 +126,22 @@ class ChangeCtxDefaultTestCase(ChangeCtxBaseTestCase):
         # shouldn't need a reload again
         self.assertFalse(ctx.needs_reload())
 
+    def test_own_repo(self):
+        ctx = self.get_ctx()
+        filectx = ctx.get_filectx('a0.rst')
+        with codecs.open(os.path.join(self.repo_path, 'a0.rst'), 'w',
+                         encoding='utf-8') as fp:
+            fp.write('changed\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+        self.assertTrue(ctx.needs_reload())
+        new_ctx = self.get_ctx()
+        self.assertTrue(new_ctx._repo is not ctx._repo)
+        # the old change context still reads the old revision.
+        self.assertEqual(ctx.get_filectx('a0.rst').content,
+                         'dumb file a0.rst\n')
+        self.assertEqual(filectx.content, 'dumb file a0.rst\n')
+        self.assertEqual(new_ctx.get_filectx('a0.rst').content, 'changed\n')
+
     def test_filectx_needs_reload(self):
 
         # add a file to repo
@@ -146,6 +176,19 @@ class ChangeCtxDefaultTestCase(ChangeCtxBaseTestCase):
         # shouldn't need a reload again
         self.assertFalse(ctx.filectx_needs_reload(filectx))
 
+    def test_filectx_needs_reload_unchanged_file(self):
+        ctx = self.get_ctx()
+        filectx = ctx.get_filectx('a0.rst')
+        with codecs.open(os.path.join(self.repo_path, 'a1.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo')
+
+        # the branch moved, but this file wasn't touched
+        self.assertTrue(ctx.needs_reload())
+        self.assertFalse(ctx.filectx_needs_reload(filectx))
+        self.assertTrue(ctx.filectx_needs_reload(ctx.get_filectx('a1.rst')))
+
     def test_published(self):
         ctx = self.get_ctx()
         date = int(time() + 1)
@@ -186,28 +229,49 @@ class ChangeCtxWorkingDirTestCase(ChangeCtxBaseTestCase):
 
     def test_needs_reload(self):
         ctx = self.get_ctx()
-        self.assertTrue(ctx.needs_reload())
+        self.assertFalse(ctx.needs_reload())
 
         # add a file to repo
-        with codecs.open(os.path.join(hg2u(self.repo.path), 'a.rst'), 'w',
+        with codecs.open(os.path.join(self.repo_path, 'a.rst'), 'w',
                          encoding='utf-8') as fp:
             fp.write('testing\n')
 
-        # should always be true
+        # should need a reload now, the directory changed
         self.assertTrue(ctx.needs_reload())
 
-        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo',
-                        addremove=True)
+        # reload
+        ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
 
-        # should need a reload now, after the commit
+        # change a tracked file
+        with codecs.open(os.path.join(self.repo_path, 'a0.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+
+        # should need a reload now, after the change
         self.assertTrue(ctx.needs_reload())
 
         # reload
         ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
 
-        # should still need a reload, right after the reload
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'foo',
+                        addremove=True)
+
+        # should need a reload now, after the commit
         self.assertTrue(ctx.needs_reload())
 
+    def test_file_id(self):
+        ctx = self.get_ctx()
+        file_id = ctx.file_id('a0.rst')
+        self.assertTrue(file_id is not None)
+        self.assertTrue(ctx.file_id('a.rst') is None)
+        with codecs.open(os.path.join(self.repo_path, 'a0.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+        ctx = self.get_ctx()
+        self.assertNotEqual(ctx.file_id('a0.rst'), file_id)
+
     def test_filectx_needs_reload(self):
 
         # add a file to repo
@@ -240,6 +304,31 @@ class ChangeCtxWorkingDirTestCase(ChangeCtxBaseTestCase):
         # should still need a reload, right after the reload
         self.assertTrue(ctx.filectx_needs_reload(filectx))
 
+    def test_history(self):
+        with codecs.open(os.path.join(self.repo_path, 'a1.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+        commands.commit(self.ui, self.repo, message=b'foo', user=b'bar')
+        with codecs.open(os.path.join(self.repo_path, 'a.rst'), 'w',
+                         encoding='utf-8') as fp:
+            fp.write('testing\n')
+        commands.add(self.ui, self.repo, u2hg(os.path.join(self.repo_path,
+                                                           'a.rst')))
+        ctx = self.get_ctx()
+        # the filelogs are read only for the files looked up.
+        self.assertEqual(ctx.get_filectx('a1.rst').date,
+                         ctx.history['a1.rst'].date)
+        self.assertEqual(list(ctx.history._entries.keys()), ['a1.rst'])
+        self.assertTrue(ctx.history.get('foo.rst') is None)
+        self.assertEqual(sorted(ctx.history.keys()), self.repo_files)
+        self.assertEqual(ctx.history['a0.rst'].author, 'foo')
+        self.assertTrue(ctx.history['a0.rst'].mdate is None)
+        self.assertEqual(ctx.history['a1.rst'].author, 'foo')
+        self.assertEqual(ctx.history['a1.rst'].first, 0)
+        self.assertEqual(ctx.history['a1.rst'].last, 1)
+        self.assertEqual(ctx.get_filectx('a1.rst').author, 'foo')
+        self.assertTrue(ctx.get_filectx('a.rst').mdate is None)
+
     def test_published(self):
         ctx = self.get_ctx()
         date = int(time() + 1)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.vcs_backends.hg.history
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Module with tests for blohg integration with mercurial (history index).
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import codecs
+import json
+import os
+import unittest
+from mercurial import commands, hg, ui
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from blohg.vcs_backends.hg.history import HistoryIndex
+from blohg.vcs_backends.hg.utils import u2hg
+
+
+class HistoryIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_path = mkdtemp()
+        self.repo_pathb = u2hg(self.repo_path)
+        self.ui = ui.ui()
+        self.ui.setconfig(b'ui', b'quiet', True)
+        commands.init(self.ui, self.repo_pathb)
+        self.repo = hg.repository(self.ui, self.repo_pathb)
+        self.cache_file = os.path.join(self.repo_path, 'history.json')
+        self.timestamp = 1234567890
+
+    def tearDown(self):
+        try:
+            rmtree(self.repo_path)
+        except:
+            pass
+
+    def commit(self, files, user=b'foo <foo@bar.com>'):
+        for f, content in files.items():
+            full_path = os.path.join(self.repo_path, f)
+            if not os.path.isdir(os.path.dirname(full_path)):
+                os.makedirs(os.path.dirname(full_path))
+            with codecs.open(full_path, 'w', encoding='utf-8') as fp:
+                fp.write(content)
+        self.timestamp += 10
+        commands.commit(self.ui, self.repo, message=b'foo', user=user,
+                        date=b'%i 0' % self.timestamp, addremove=True)
+        return self.repo[b'tip'].hex().decode('ascii')
+
+    def get_index(self):
+        return HistoryIndex(self.repo, self.repo[b'tip'].node(),
+                            cache_file=self.cache_file)
+
+    def test_first_and_last_changesets(self):
+        c1 = self.commit({'a.rst': 'a', 'content/post/b.rst': 'b'})
+        c2 = self.commit({'content/post/c.rst': 'c'}, user=b'bar')
+        c3 = self.commit({'content/post/b.rst': 'b2'}, user=b'bar')
+        index = self.get_index()
+        a = index.get('a.rst')
+        self.assertEqual(a.first, c1)
+        self.assertEqual(a.date, 1234567900)
+        self.assertTrue(a.mdate is None)
+        self.assertEqual(a.author, 'foo <foo@bar.com>')
+        b = index.get('content/post/b.rst')
+        self.assertEqual(b.first, c1)
+        self.assertEqual(b.last, c3)
+        self.assertEqual(b.mdate, 1234567920)
+        c = index.get('content/post/c.rst')
+        self.assertEqual(c.first, c2)
+        self.assertEqual(c.author, 'bar')
+        self.assertFalse('d.rst' in index)
+
+    def test_cache_file(self):
+        c1 = self.commit({'a.rst': 'a'})
+        index = self.get_index()
+        self.assertEqual(index.tip, c1)
+        with open(self.cache_file) as fp:
+            self.assertEqual(json.load(fp)['tip'], c1)
+        c2 = self.commit({'a.rst': 'a2', 'b.rst': 'b'})
+        walked = []
+        _walk = HistoryIndex._walk
+
+        def walk(self, tip, since=None):
+            for rv in _walk(self, tip, since):
+                walked.append(rv[0])
+                yield rv
+        HistoryIndex._walk = walk
+        try:
+            index = self.get_index()
+            self.assertEqual(walked, [c2])
+            del walked[:]
+            index = self.get_index()
+            self.assertEqual(walked, [])
+        finally:
+            HistoryIndex._walk = _walk
+        self.assertEqual(index.get('a.rst').first, c1)
+        self.assertEqual(index.get('a.rst').last, c2)
+        self.assertEqual(index.get('b.rst').first, c2)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.vcs_backends.snapshot
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Package with tests for blohg integration with snapshot files.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import os
+import unittest
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from blohg.vcs_backends.fs import FsRepository
+from blohg.vcs_backends.snapshot import SnapshotRepository
+from blohg.vcs_backends.snapshot.archive import SNAPSHOT_FILE, write_snapshot
+from blohg.vcs_backends.snapshot.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir
+from blohg.vcs import load_repo, REVISION_DEFAULT, REVISION_WORKING_DIR
+
+
+class SnapshotRepositoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_path = mkdtemp()
+        self.snapshot_path = mkdtemp()
+        FsRepository.create_repo(self.repo_path)
+        write_snapshot(FsRepository(self.repo_path).get_changectx(),
+                       os.path.join(self.snapshot_path, SNAPSHOT_FILE))
+
+    def tearDown(self):
+        for path in [self.repo_path, self.snapshot_path]:
+            try:
+                rmtree(path)
+            except:
+                pass
+
+    def test_create_repo(self):
+        with self.assertRaises(RuntimeError):
+            SnapshotRepository.create_repo(self.snapshot_path)
+
+    def test_supported(self):
+        self.assertTrue(SnapshotRepository.supported(self.snapshot_path))
+        self.assertFalse(SnapshotRepository.supported(self.repo_path))
+        self.assertTrue(isinstance(load_repo(self.snapshot_path),
+                                   SnapshotRepository))
+
+    def test_get_changectx(self):
+        repo = SnapshotRepository(self.snapshot_path)
+        self.assertTrue(isinstance(repo.get_changectx(REVISION_DEFAULT),
+                                   ChangeCtxDefault))
+        self.assertTrue(isinstance(repo.get_changectx(REVISION_WORKING_DIR),
+                                   ChangeCtxWorkingDir))
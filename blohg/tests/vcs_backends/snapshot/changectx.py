@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.tests.vcs_backends.snapshot.changectx
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Module with tests for blohg integration with snapshot files (change
+    context).
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import codecs
+import os
+import unittest
+
+from mercurial import commands, hg, ui
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import sleep, time
+
+from blohg.vcs_backends.hg.changectx import ChangeCtxDefault as \
+     HgChangeCtxDefault
+from blohg.vcs_backends.hg.utils import u2hg
+from blohg.vcs_backends.snapshot.archive import SNAPSHOT_FILE, write_snapshot
+from blohg.vcs_backends.snapshot.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir
+
+
+class ChangeCtxBaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.repo_path = mkdtemp()
+        self.snapshot_path = mkdtemp()
+        self.ui = ui.ui()
+        self.ui.setconfig(b'ui', b'quiet', True)
+        commands.init(self.ui, u2hg(self.repo_path))
+        self.repo_files = ['a%i.rst' % i for i in range(5)] + \
+            ['content/post/b.rst', 'content/post/c.rst']
+        os.makedirs(os.path.join(self.repo_path, 'content', 'post'))
+        for i in self.repo_files:
+            with codecs.open(os.path.join(self.repo_path, i), 'w',
+                             encoding='utf-8') as fp:
+                fp.write('dumb file\n' if i.startswith('content') else
+                         'dumb file %s\n' % i)
+        self.commit()
+        self.write_snapshot()
+
+    def tearDown(self):
+        for path in [self.repo_path, self.snapshot_path]:
+            try:
+                rmtree(path)
+            except:
+                pass
+
+    def commit(self):
+        repo = hg.repository(self.ui, u2hg(self.repo_path))
+        commands.commit(self.ui, repo, message=b'foo', user=b'foo',
+                        addremove=True)
+
+    def write_snapshot(self):
+        self.source = HgChangeCtxDefault(self.repo_path)
+        write_snapshot(self.source, os.path.join(self.snapshot_path,
+                                                 SNAPSHOT_FILE))
+
+    @property
+    def ctx_class(self):
+        raise NotImplementedError
+
+    def get_ctx(self):
+        return self.ctx_class(self.snapshot_path)
+
+
+class ChangeCtxDefaultTestCase(ChangeCtxBaseTestCase):
+
+    ctx_class = ChangeCtxDefault
+
+    def test_files(self):
+        ctx = self.get_ctx()
+        self.assertEqual(ctx.files, sorted(self.repo_files))
+        self.assertEqual(ctx.revision_id, self.source._ctx.hex().decode())
+        for f in self.repo_files:
+            filectx = ctx.get_filectx(f)
+            source = self.source.get_filectx(f)
+            self.assertEqual(filectx.data, source.data)
+            self.assertEqual(filectx.content, source.content)
+            self.assertEqual(filectx.date, source.date)
+            self.assertEqual(filectx.mdate, source.mdate)
+            self.assertEqual(filectx.author, source.author)
+        with self.assertRaises(RuntimeError):
+            ctx.get_filectx('d.rst')
+
+    def test_get_contents(self):
+        ctx = self.get_ctx()
+        contents = ctx.get_contents(self.repo_files)
+        for f in self.repo_files:
+            self.assertEqual(contents[f], ctx.get_filectx(f).content)
+
+    def test_file_id(self):
+        ctx = self.get_ctx()
+        self.assertEqual(ctx.file_id('content/post/b.rst'),
+                         ctx.file_id('content/post/c.rst'))
+        self.assertNotEqual(ctx.file_id('a0.rst'), ctx.file_id('a1.rst'))
+        self.assertTrue(ctx.file_id('d.rst') is None)
+
+    def test_invalid_snapshot(self):
+        with open(os.path.join(self.snapshot_path, SNAPSHOT_FILE), 'wb') as fp:
+            fp.write(b'lol')
+        with self.assertRaises(RuntimeError):
+            self.get_ctx()
+
+    def test_needs_reload(self):
+        ctx = self.get_ctx()
+        filectx = ctx.get_filectx('a0.rst')
+        self.assertFalse(ctx.needs_reload())
+        self.assertFalse(ctx.filectx_needs_reload(filectx))
+
+        with codecs.open(os.path.join(self.repo_path, 'a0.rst'), 'a',
+                         encoding='utf-8') as fp:
+            fp.write('lol\n')
+        self.commit()
+        self.write_snapshot()
+
+        self.assertTrue(ctx.needs_reload())
+        self.assertTrue(ctx.filectx_needs_reload(filectx))
+
+        # the old snapshot is still readable
+        self.assertEqual(filectx.content, 'dumb file a0.rst\n')
+
+        old_ctx = ctx
+        ctx = self.get_ctx()
+        self.assertFalse(ctx.needs_reload())
+        self.assertEqual(ctx.get_filectx('a0.rst').content,
+                         'dumb file a0.rst\nlol\n')
+
+        # file contexts of the old snapshot need a reload only if the file
+        # changed.
+        self.assertTrue(ctx.filectx_needs_reload(filectx))
+        self.assertFalse(ctx.filectx_needs_reload(
+            old_ctx.get_filectx('a1.rst')))
+        self.assertFalse(ctx.filectx_needs_reload(ctx.get_filectx('a0.rst')))
+
+    def test_published(self):
+        ctx = self.get_ctx()
+        date = int(time() + 1)
+        self.assertFalse(ctx.published(date, time()))
+        sleep(1)
+        self.assertTrue(ctx.published(date, time()))
+
+
+class ChangeCtxWorkingDirTestCase(ChangeCtxBaseTestCase):
+
+    ctx_class = ChangeCtxWorkingDir
+
+    def test_published(self):
+        ctx = self.get_ctx()
+        date = int(time() + 1)
+        self.assertTrue(ctx.published(date, time()))
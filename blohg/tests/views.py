@@ -11,6 +11,7 @@
 
 import os
 import unittest
+from datetime import datetime
 from hashlib import md5
 from mercurial import commands, hg, ui
 from shutil import rmtree
@@ -86,6 +87,34 @@ class ViewsTestCase(unittest.TestCase):
         rv = c.get('/tag/foo-bar/')
         self.assertEqual(rv.status_code, 404)
 
+    def test_archive(self):
+        c = self.app.test_client()
+        now = datetime.utcnow()
+        for url in ['/archive/%i/' % now.year,
+                    '/archive/%i/%i/' % (now.year, now.month),
+                    '/archive/%i/%i/page/1/' % (now.year, now.month)]:
+            rv = c.get(url)
+            self.assertTrue(b'<html' in rv.data)
+            for i in [b'/post/example-post/', b'/post/lorem-ipsum/']:
+                self.assertTrue(i in rv.data, '%r not in %s' % (i, url))
+        rv = c.get('/archive/%i/%i/page/2/' % (now.year, now.month))
+        self.assertEqual(rv.status_code, 404)
+        rv = c.get('/archive/%i/13/' % now.year)
+        self.assertEqual(rv.status_code, 404)
+        rv = c.get('/archive/2009/')
+        self.assertEqual(rv.status_code, 404)
+
+    def test_search(self):
+        c = self.app.test_client()
+        rv = c.get('/search/?q=lorem')
+        self.assertTrue(b'<html' in rv.data)
+        self.assertTrue(b'/post/lorem-ipsum/' in rv.data)
+        self.assertFalse(b'/post/example-post/' in rv.data)
+        rv = c.get('/search/?q=lorem&page=2')
+        self.assertFalse(b'/post/lorem-ipsum/' in rv.data)
+        rv = c.get('/search/')
+        self.assertEqual(rv.status_code, 200)
+
     def test_source(self):
         c = self.app.test_client()
         rv = c.get('/source/post/lorem-ipsum/')
@@ -9,11 +9,19 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
+import json
 import os
+import posixpath
+import threading
 from abc import ABCMeta, abstractmethod, abstractproperty
+from flask.helpers import locked_cached_property
 
 REVISION_WORKING_DIR, REVISION_DEFAULT = 1, 2
 
+# name of the file used to persist the history indexes, inside the metadata
+# directory of the repositories.
+HISTORY_CACHE_FILE = 'blohg-history.json'
+
 
 class Repository(metaclass=ABCMeta):
 
@@ -32,6 +40,10 @@ class Repository(metaclass=ABCMeta):
     def name(self):
         pass
 
+    # backends that can't initialize repositories, like the read-only ones,
+    # should set this to False.
+    creatable = True
+
     @abstractmethod
     def get_changectx(self, revision=None):
         pass
@@ -59,6 +71,11 @@ class ChangeCtx(metaclass=ABCMeta):
     def files(self):
         pass
 
+    @locked_cached_property
+    def file_set(self):
+        """Set with the paths of all the files, for fast lookups."""
+        return frozenset(self.files)
+
     @abstractmethod
     def needs_reload(self):
         pass
@@ -75,6 +92,21 @@ class ChangeCtx(metaclass=ABCMeta):
     def get_filectx(self, path):
         pass
 
+    def file_id(self, path):
+        """Returns an identifier of the content of the given file, that
+        changes whenever the file changes, or ``None`` if the backend can't
+        tell. Used to reuse objects built from unchanged files across
+        reloads.
+        """
+        return None
+
+    def get_contents(self, paths):
+        """Returns a dictionary with the UTF-8 decoded contents of the given
+        paths. Backends can override this method to load all the files in a
+        single pass.
+        """
+        return dict((path, self.get_filectx(path).content) for path in paths)
+
     @abstractmethod
     def etag(self, filectx):
         pass
@@ -106,29 +138,239 @@ class FileCtx(metaclass=ABCMeta):
     def author(self):
         pass
 
+    def release(self):
+        """Releases the data of the file. It is read again when needed."""
+        self.__dict__.pop('data', None)
+        self.__dict__.pop('content', None)
+
+
+def stat_files(base_dir, paths):
+    """Returns a dictionary mapping the given paths, relative to ``base_dir``,
+    to their modification times and sizes. Missing paths are omitted.
+    """
+    rv = {}
+    for path in paths:
+        try:
+            st = os.stat(os.path.join(base_dir, path))
+        except OSError:
+            continue
+        rv[path] = (st.st_mtime_ns, st.st_size)
+    return rv
+
+
+def working_dir_state(base_dir, files, extra_paths=[]):
+    """Returns the :func:`stat_files` of the given files, of the directories
+    that contain them and of some extra paths, like the dirstate/index of the
+    VCS. Creating or removing a file changes the modification time of its
+    directory, then comparing two states is enough to detect any change in the
+    working directory, without listing it again.
+    """
+    paths = set(files)
+    paths.update(extra_paths)
+    for f in files:
+        while f:
+            f = posixpath.dirname(f)
+            if f in paths:
+                break
+            paths.add(f)
+    return stat_files(base_dir, paths)
+
+
+class HistoryEntry(object):
+    """Creation/modification data of a file: the first and the last revisions
+    that touched it, their dates and the author of the first one.
+    """
+
+    def __init__(self, first, date, author, last=None, last_date=None):
+        self.first = first
+        self.date = date
+        self.author = author
+        self.last = first if last is None else last
+        self.last_date = date if last_date is None else last_date
+
+    def touch(self, last, last_date):
+        return HistoryEntry(self.first, self.date, self.author, last,
+                            last_date)
+
+    @property
+    def mdate(self):
+        if self.last != self.first:
+            return self.last_date
+
+
+class HistoryIndex(metaclass=ABCMeta):
+    """Index with the :class:`HistoryEntry` of every file ever committed to a
+    branch, up to its tip revision.
+
+    The index can be persisted to a cache file, keyed by the tip revision. When
+    the branch moves forward, only the revisions between the cached tip and the
+    new one are walked.
+    """
+
+    cache_version = 1
+
+    def __init__(self, cache_file=None):
+        self.tip = None
+        self._entries = {}
+        self._cache_file = cache_file
+
+    @abstractmethod
+    def _walk(self, tip, since=None):
+        """Yields a ``(revision, date, author, paths)`` tuple for every
+        revision reachable from ``tip`` and not from ``since``, parents first.
+        """
+
+    @abstractmethod
+    def _is_ancestor(self, revision, tip):
+        pass
+
+    def update(self, tip):
+        """Brings the index up to date with the given tip revision."""
+        if tip == self.tip:
+            return
+        since = self.tip
+        if since is None or not self._is_ancestor(since, tip):
+            self._entries = {}
+            since = None
+        for revision, date, author, paths in self._walk(tip, since):
+            for path in paths:
+                entry = self._entries.get(path)
+                if entry is None:
+                    self._entries[path] = HistoryEntry(revision, date, author)
+                else:
+                    self._entries[path] = entry.touch(revision, date)
+        self.tip = tip
+
+    def sync(self, tip):
+        """Loads the index from the cache file, updates it to the given tip
+        revision and saves it back, if needed.
+        """
+        self.load()
+        if tip != self.tip:
+            self.update(tip)
+            self.save()
+
+    def load(self):
+        if self._cache_file is None or not os.path.isfile(self._cache_file):
+            return
+        try:
+            with open(self._cache_file) as fp:
+                data = json.load(fp)
+            if data['version'] != self.cache_version:
+                return
+            entries = dict((path, HistoryEntry(*entry)) for path, entry in \
+                           data['entries'].items())
+        except Exception:
+            # a broken cache file is just ignored, and rewritten later.
+            return
+        self.tip = data['tip']
+        self._entries = entries
+
+    def save(self):
+        if self._cache_file is None:
+            return
+        data = {'version': self.cache_version, 'tip': self.tip,
+                'entries': dict((path, [i.first, i.date, i.author, i.last,
+                                        i.last_date])
+                                for path, i in self._entries.items())}
+        tmp_file = '%s.%i' % (self._cache_file, os.getpid())
+        try:
+            cache_dir = os.path.dirname(self._cache_file)
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with open(tmp_file, 'w') as fp:
+                json.dump(data, fp)
+            os.replace(tmp_file, self._cache_file)
+        except (IOError, OSError):
+            # the repository may be read-only for the user running blohg. the
+            # index is still usable, it just won't be reused by other
+            # processes.
+            pass
+
+    def get(self, path):
+        """Returns the :class:`HistoryEntry` for the given path, or ``None``
+        if the path was never committed to the branch.
+        """
+        return self._entries.get(path)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RepositoryPool(threading.local):
+    """Thread-local pool of low-level repository handles, shared by the VCS
+    backends. Opening a repository is expensive, and blohg checks for new
+    revisions before every request, so the handles are reused by a thread to
+    look for them. The backends are responsible for refreshing their handles,
+    and shouldn't refresh a handle that is still read by a change context.
+    """
+
+    def __init__(self):
+        self._handles = {}
+
+    def get(self, identifier, path, factory):
+        """Returns the handle for the repository of the given backend
+        identifier and path, calling ``factory(path)`` to open it if this
+        thread didn't yet.
+        """
+        key = (identifier, path)
+        handle = self._handles.get(key)
+        if handle is None:
+            handle = self._handles[key] = factory(path)
+        return handle
+
+    def clear(self):
+        self._handles.clear()
+
 
-def _get_backends():
+repository_pool = RepositoryPool()
+
+
+# backends, and the files that mark their repositories, in order of
+# preference. The marked backends are imported before the others, so serving
+# a repository doesn't import the VCS libraries of the other backends.
+backend_markers = [('hg', '.hg'), ('git', '.git'),
+                   ('snapshot', 'blohg.snapshot'), ('fs', 'config.yaml')]
+
+
+def _import_backend(identifier):
+    try:
+        __import__('blohg.vcs_backends.%s' % identifier)
+    except ImportError:
+        return None
+    for backend in Repository.__subclasses__():
+        if backend.identifier == identifier:
+            return backend
+
+
+def get_backends():
+    """Imports all the available backends, and returns them sorted by
+    order.
+    """
     cwd = os.path.dirname(os.path.abspath(__file__))
     backends_dir = os.path.join(cwd, 'vcs_backends')
     for d in os.listdir(backends_dir):
         if not os.path.isdir(os.path.join(backends_dir, d)):
             continue
-        try:
-            __import__('blohg.vcs_backends.%s' % d)
-        except ImportError:
-            pass
+        _import_backend(d)
     rv = sorted(Repository.__subclasses__(), key=lambda x: x.order)
     if not len(rv):
         raise RuntimeError('No backend found!')
     return rv
 
 
-backends = _get_backends()
-del _get_backends
-
-
 def load_repo(repo_path):
-    for backend in backends:
+    for identifier, marker in backend_markers:
+        if not os.path.exists(os.path.join(repo_path, marker)):
+            continue
+        backend = _import_backend(identifier)
+        if backend is not None and backend.supported(repo_path):
+            return backend(repo_path)
+    # repositories without markers, like the bare git repositories.
+    for backend in get_backends():
         if backend.supported(repo_path):
             return backend(repo_path)
     raise RuntimeError('No VCS backend available for %s. If you are trying to '
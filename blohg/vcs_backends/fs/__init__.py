@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.fs
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Package with all the classes and functions needed to serve a plain
+    directory tree, without any VCS. Useful for deployments that copy a
+    checkout of the repository to the server.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import os
+import shutil
+
+from pkg_resources import resource_filename, resource_listdir
+from blohg.vcs_backends.fs.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir, MARKER_FILE
+from blohg.vcs import Repository, REVISION_DEFAULT, REVISION_WORKING_DIR
+
+
+class FsRepository(Repository):
+    """Main entrypoint for the plain filesystem layer. This class offers
+    abstract access to everything needed by blohg from a directory tree.
+    """
+
+    identifier = 'fs'
+    name = 'plain filesystem'
+    order = 20
+
+    def get_changectx(self, revision=REVISION_DEFAULT):
+        """Method that returns a change context for a given Revision state.
+
+        blohg supports 2 revision states.
+
+        - default: includes all the files of the directory, excluding the
+                   hidden ones, reloaded only when the marker file
+                   (``.blohg-reload``) is touched.
+        - working_dir: includes the same files, reloaded whenever any of them
+                       changes.
+
+        The creation/modification dates and the authors of the files are read
+        from the ``.blohg-manifest.json`` file, if available. Otherwise the
+        creation date is the modification time of the file.
+        """
+        if revision == REVISION_DEFAULT:
+            return ChangeCtxDefault(self.path)
+        elif revision == REVISION_WORKING_DIR:
+            return ChangeCtxWorkingDir(self.path)
+        raise RuntimeError('Invalid repository revision: %r' % revision)
+
+    @staticmethod
+    def create_repo(repo_path):
+        """Function to initialize a blohg repo, with the default template files
+        inside.
+        """
+
+        template_path = resource_filename('blohg', 'repo_template')
+        template_rootfiles = resource_listdir('blohg', 'repo_template')
+
+        initialized = False
+        for f in template_rootfiles + [MARKER_FILE]:
+            if os.path.exists(os.path.join(repo_path, f)):
+                initialized = True
+
+        if initialized:
+            raise RuntimeError('repository already initialized: %s' % \
+                               repo_path)
+
+        if not os.path.exists(repo_path):
+            os.makedirs(repo_path)
+
+        for f in template_rootfiles:
+            full_path = os.path.join(template_path, f)
+            if os.path.isdir(full_path):
+                shutil.copytree(full_path, os.path.join(repo_path, f))
+            elif os.path.isfile(full_path):
+                shutil.copy2(full_path, os.path.join(repo_path, f))
+            else:
+                raise RuntimeError('unrecognized file: %s' % full_path)
+
+        open(os.path.join(repo_path, MARKER_FILE), 'w').close()
+
+    @staticmethod
+    def supported(repo_path):
+        if not os.path.isdir(repo_path):
+            return False
+        files = os.listdir(repo_path)
+        # checkouts are served by their VCS backends.
+        if '.hg' in files or '.git' in files:
+            return False
+        return 'config.yaml' in files
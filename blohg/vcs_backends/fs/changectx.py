@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.fs.changectx
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Model with classes to represent plain filesystem change context.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import json
+import os
+import time
+from flask.helpers import locked_cached_property
+from zlib import adler32
+
+from blohg.vcs_backends.fs.filectx import FileCtx
+from blohg.vcs import ChangeCtx, stat_files, working_dir_state
+
+# file touched by the deployment scripts after the files are copied to the
+# server, to ask blohg to reload them.
+MARKER_FILE = '.blohg-reload'
+
+# JSON file with a dictionary mapping paths to dictionaries with the 'date',
+# 'mdate' and 'author' of the files.
+MANIFEST_FILE = '.blohg-manifest.json'
+
+
+def _walk(base_dir, prefix=''):
+    # yields the (path, stat) of all the files, skipping hidden files and
+    # directories.
+    try:
+        entries = sorted(os.scandir(base_dir), key=lambda x: x.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        path = prefix + entry.name
+        if entry.is_dir():
+            for i in _walk(entry.path, path + '/'):
+                yield i
+        elif entry.is_file():
+            st = entry.stat()
+            yield path, (st.st_mtime_ns, st.st_size)
+
+
+class ChangeCtxDefault(ChangeCtx):
+    """Class with the specific implementation details for the change context
+    of a plain directory tree, that is reloaded only when the marker file is
+    touched.
+    """
+
+    def __init__(self, repo_path):
+        self._repo_path = repo_path
+        self._marker = self._get_marker_stat()
+        self._stats = dict(_walk(self._repo_path))
+        self._manifest = {}
+        try:
+            with open(os.path.join(self._repo_path, MANIFEST_FILE)) as fp:
+                self._manifest = json.load(fp)
+        except (OSError, ValueError):
+            pass
+
+    def _get_marker_stat(self):
+        return stat_files(self._repo_path, [MARKER_FILE]).get(MARKER_FILE)
+
+    @locked_cached_property
+    def revision_id(self):
+        if self._marker is not None:
+            return '%x' % self._marker[0]
+
+    @locked_cached_property
+    def files(self):
+        return sorted(self._stats)
+
+    def needs_reload(self):
+        return self._get_marker_stat() != self._marker
+
+    def filectx_needs_reload(self, filectx):
+        """A file context needs a reload if this change context needs one,
+        or if it was built from an older change context, with another version
+        of the file.
+        """
+        if self.needs_reload():
+            return True
+        changectx = filectx._changectx
+        return changectx is not self and \
+            changectx.file_id(filectx.path) != self.file_id(filectx.path)
+
+    def published(self, date, now):
+        return date <= now
+
+    def file_id(self, path):
+        return self._stats.get(path)
+
+    def get_filectx(self, path):
+        if path not in self._stats:
+            raise RuntimeError('Invalid file: %s' % path)
+        return FileCtx(self._repo_path, self, path,
+                       metadata=self._manifest.get(path))
+
+    def etag(self, filectx):
+        return 'blohg-%i-%i-%s' % (filectx.mdate or filectx.date,
+                                   len(filectx.data),
+                                   adler32(filectx.path.encode('utf-8'))
+                                   & 0xffffffff)
+
+
+class ChangeCtxWorkingDir(ChangeCtxDefault):
+    """Class with the specific implementation details for the change context
+    of a plain directory tree, that is reloaded whenever a file changes.
+    """
+
+    revision_id = None
+
+    def __init__(self, repo_path):
+        ChangeCtxDefault.__init__(self, repo_path)
+        self._state = working_dir_state(self._repo_path, self.files,
+                                        [MANIFEST_FILE])
+
+    def needs_reload(self):
+        """This change context is mainly used by the command-line tool. Its
+        "freshness" is evaluated by comparing the modification times and sizes
+        of the files, of their directories and of the manifest with the ones
+        from when it was created.
+        """
+        return stat_files(self._repo_path, self._state) != self._state
+
+    def filectx_needs_reload(self, filectx):
+        return True
+
+    def published(self, date, now):
+        return True
+
+    def etag(self, filectx):
+        return 'blohg-%i-%i-%s' % (time.time(), len(filectx.data),
+                                   adler32(filectx.path.encode('utf-8'))
+                                   & 0xffffffff)
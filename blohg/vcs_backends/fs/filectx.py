@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.fs.filectx
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Model with classes to represent plain filesystem file context.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import os
+from flask.helpers import locked_cached_property
+
+from blohg.vcs import FileCtx as _FileCtx
+
+
+class FileCtx(_FileCtx):
+    """Base class that represents a file context."""
+
+    def __init__(self, repo_path, changectx, path, metadata=None):
+        self._repo_path = repo_path
+        self._changectx = changectx
+        self._path = path
+        self._metadata = metadata or {}
+        self._full_path = os.path.join(self._repo_path, *path.split('/'))
+
+    @locked_cached_property
+    def path(self):
+        """UTF-8 encoded file path, relative to the repository root."""
+        return self._path
+
+    @locked_cached_property
+    def data(self):
+        """Raw data of the file."""
+        with open(self._full_path, 'rb') as fp:
+            return fp.read()
+
+    @locked_cached_property
+    def content(self):
+        """UTF-8 encoded content of the file."""
+        return self.data.decode('utf-8')
+
+    @locked_cached_property
+    def date(self):
+        """Unix timestamp of the creation date of the file, from the manifest
+        or from the modification time of the file.
+        """
+        if 'date' in self._metadata:
+            return int(self._metadata['date'])
+        return int(os.stat(self._full_path).st_mtime)
+
+    @locked_cached_property
+    def mdate(self):
+        """Unix timestamp of the last modification date of the file, from the
+        manifest.
+        """
+        if 'mdate' in self._metadata:
+            return int(self._metadata['mdate'])
+
+    @locked_cached_property
+    def author(self):
+        """The creator of the file, from the manifest."""
+        return self._metadata.get('author')
@@ -9,13 +9,16 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
+import os
 import time
 from flask.helpers import locked_cached_property
-from pygit2 import Repository, GIT_OBJ_BLOB, GIT_OBJ_TREE
+from pygit2 import Repository, GIT_FILEMODE_COMMIT, GIT_FILEMODE_TREE
 from zlib import adler32
 
 from blohg.vcs_backends.git.filectx import FileCtx
-from blohg.vcs import ChangeCtx
+from blohg.vcs_backends.git.history import HistoryIndex
+from blohg.vcs import ChangeCtx, HISTORY_CACHE_FILE, repository_pool, \
+     stat_files, working_dir_state
 
 
 class ChangeCtxDefault(ChangeCtx):
@@ -26,24 +29,32 @@ class ChangeCtxDefault(ChangeCtx):
 
     def __init__(self, repo_path):
         self._repo_path = repo_path
-        self._repo = Repository(self._repo_path)
+        self._repo = repository_pool.get('git', self._repo_path, Repository)
         self._ctx = self._repo[self.revision_id]
+        self._tree_cache = {}
 
     @locked_cached_property
-    def files(self):
-        def r(_files, repo, tree, prefix=None):
+    def _tree_entries(self):
+        """Mapping of the paths of all the files of the tree to the oids of
+        their blobs. The type of each entry is decided by its file mode, so
+        blobs are never loaded.
+        """
+        def r(_entries, tree, prefix=None):
             for entry in tree:
-                obj = repo[entry.oid]
                 filename = prefix and (prefix + '/' + entry.name) or entry.name
-                if obj.type == GIT_OBJ_TREE:
-                    r(_files, repo, obj, filename)
-                elif obj.type == GIT_OBJ_BLOB:
-                    _files.append(filename)
-                else:
+                if entry.filemode == GIT_FILEMODE_TREE:
+                    r(_entries, self._repo[entry.oid], filename)
+                elif entry.filemode == GIT_FILEMODE_COMMIT:
                     raise RuntimeError('Invalid object: %s' % filename)
-        f = []
-        r(f, self._repo, self._ctx.tree)
-        return sorted(f)
+                else:
+                    _entries[filename] = entry.oid
+        rv = {}
+        r(rv, self._ctx.tree)
+        return rv
+
+    @locked_cached_property
+    def files(self):
+        return sorted(self._tree_entries)
 
     @locked_cached_property
     def revision_id(self):
@@ -56,6 +67,15 @@ class ChangeCtxDefault(ChangeCtx):
             raise RuntimeError('Branch "master" not found!')
         return ref.target
 
+    @locked_cached_property
+    def history(self):
+        """Index with the creation/modification data of every file, shared by
+        all the file contexts of this change context. It is persisted inside
+        the git directory, and updated incrementally when the branch moves.
+        """
+        return HistoryIndex(self._repo, cache_file=os.path.join(
+            self._repo.path, HISTORY_CACHE_FILE))
+
     def needs_reload(self):
         try:
             ref = self._repo.lookup_reference('refs/heads/master')
@@ -80,7 +100,30 @@ class ChangeCtxDefault(ChangeCtx):
                                    & 0xffffffff)
 
     def get_filectx(self, path):
-        return FileCtx(self._repo, self._ctx, path)
+        return FileCtx(self._repo, self._ctx, path, history=self.history,
+                       tree_cache=self._tree_cache,
+                       oid=self._tree_entries.get(path))
+
+    def file_id(self, path):
+        """The oid of the blob of the file."""
+        return self._tree_entries.get(path)
+
+    def get_contents(self, paths):
+        """Loads the blobs of all the given paths in a single pass over the
+        object database. The blobs are read in the order of the tree walk,
+        that is also the order used by git to write them to the packs, and
+        blobs shared by more than one path are read only once.
+        """
+        wanted = set(paths)
+        blobs = {}
+        rv = {}
+        for path, oid in self._tree_entries.items():
+            if path not in wanted:
+                continue
+            if oid not in blobs:
+                blobs[oid] = self._repo.odb.read(oid)[1].decode('utf-8')
+            rv[path] = blobs[oid]
+        return rv
 
 
 class ChangeCtxWorkingDir(ChangeCtxDefault):
@@ -89,6 +132,15 @@ class ChangeCtxWorkingDir(ChangeCtxDefault):
     from the class :class:`ChangeCtxBase`.
     """
 
+    def __init__(self, repo_path):
+        ChangeCtxDefault.__init__(self, repo_path)
+        # the repository handle is reused, the index should be re-read from
+        # the disk if it changed.
+        self._repo.index.read(False)
+        self._state = working_dir_state(self._repo.workdir, self.files,
+                                        [os.path.join(self._repo.path,
+                                                      'index')])
+
     @locked_cached_property
     def revision_id(self):
         if self._repo.workdir is None:
@@ -105,11 +157,15 @@ class ChangeCtxWorkingDir(ChangeCtxDefault):
         return [entry.path for entry in self._repo.index]
 
     def needs_reload(self):
-        """This change context is mainly used by the command-line tool, and
-        didn't provides any reliable way to evaluate its "freshness". Always
-        reload.
+        """This change context is mainly used by the command-line tool. Its
+        "freshness" is evaluated by comparing the modification times and sizes
+        of the files, of their directories and of the git index with the ones
+        from when it was created.
         """
-        return True
+        return stat_files(self._repo.workdir, self._state) != self._state
+
+    def file_id(self, path):
+        return self._state.get(path)
 
     def filectx_needs_reload(self, filectx):
         return True
@@ -123,4 +179,9 @@ class ChangeCtxWorkingDir(ChangeCtxDefault):
                                    & 0xffffffff)
 
     def get_filectx(self, path):
-        return FileCtx(self._repo, self._ctx, path, use_index=True)
+        return FileCtx(self._repo, self._ctx, path, use_index=True,
+                       history=self.history, tree_cache=self._tree_cache)
+
+    def get_contents(self, paths):
+        # files are read from the working directory, not from the tree.
+        return ChangeCtx.get_contents(self, paths)
@@ -10,76 +10,90 @@
 """
 
 import os
+import posixpath
 import time
 from flask.helpers import locked_cached_property
-from pygit2 import GIT_OBJ_BLOB, GIT_SORT_REVERSE, GIT_SORT_TIME, \
-    GIT_SORT_TOPOLOGICAL
+from pygit2 import GIT_OBJ_BLOB, GIT_OBJ_TREE
 
+from blohg.vcs_backends.git.history import HistoryIndex
 from blohg.vcs import FileCtx as _FileCtx
 
 
 class FileCtx(_FileCtx):
-    """Base class that represents a file context."""
+    """Base class that represents a file context.
 
-    def __init__(self, repo, changectx, path, use_index=False):
+    Only the oid of the blob of the file is kept, the blob is loaded when the
+    data of the file is needed. If the oid isn't given, it is looked up in
+    the tree of the change context, or in the index.
+    """
+
+    def __init__(self, repo, changectx, path, use_index=False, history=None,
+                 tree_cache=None, oid=None):
         self._repo = repo
         self._changectx = changectx
         self._path = path
         self._use_index = use_index
-        try:
-            oid = self._changectx.oid
-        except AttributeError:
-            oid = self._changectx.target
-        self._ctx = self.get_fileobj_from_basetree(
-            self._repo[oid].tree, self._path)
-        if not self._ctx or self._ctx.type != GIT_OBJ_BLOB or use_index:
+        self._history = history
+        self._tree_cache = {} if tree_cache is None else tree_cache
+        if oid is None and not use_index:
+            try:
+                commit_oid = self._changectx.oid
+            except AttributeError:
+                commit_oid = self._changectx.target
+            obj = self.get_fileobj_from_basetree(
+                self._repo[commit_oid].tree, self._path)
+            if obj and obj.type == GIT_OBJ_BLOB:
+                oid = obj.oid
+        if oid is None:
             try:
-                self._ctx = self._repo[self._repo.index[self._path].oid]
+                oid = self._repo.index[self._path].oid
             except:
                 raise RuntimeError('Invalid file: %s' % self._path)
+        self._oid = oid
 
     def get_fileobj_from_basetree(self, basetree, path):
-        tree = [basetree]
-        for piece in path.split('/'):
+        dirname, basename = posixpath.split(path)
+        tree = self.get_subtree(basetree, dirname)
+        if tree is None:
+            return None
+        try:
+            return self._repo[tree[basename].oid]
+        except KeyError:
+            return None
+
+    def get_subtree(self, basetree, dirname):
+        """Returns the tree of the given directory, relative to the base tree,
+        or ``None`` if it doesn't exists. The trees are memoized by the oid of
+        the base tree and the directory name, in a cache that may be shared by
+        all the file contexts of a change context.
+        """
+        if not dirname:
+            return basetree
+        key = (basetree.oid, dirname)
+        try:
+            return self._tree_cache[key]
+        except KeyError:
+            pass
+        parent, name = posixpath.split(dirname)
+        tree = self.get_subtree(basetree, parent)
+        subtree = None
+        if tree is not None:
             try:
-                tree.append(self._repo[tree.pop()[piece].oid])
+                subtree = self._repo[tree[name].oid]
             except KeyError:
-                return None
-        return tree.pop()
+                pass
+            else:
+                if subtree.type != GIT_OBJ_TREE:
+                    subtree = None
+        self._tree_cache[key] = subtree
+        return subtree
 
     @locked_cached_property
-    def _first_changeset(self):
-        try:
-            ref = self._repo.lookup_reference('refs/heads/master')
-        except Exception:
-            raise RuntimeError('Branch "master" not found!')
-        for commit in self._repo.walk(ref.target,
-                                      GIT_SORT_TOPOLOGICAL |
-                                      GIT_SORT_TIME |
-                                      GIT_SORT_REVERSE):
-            obj = self.get_fileobj_from_basetree(commit.tree, self._path)
-            if obj is not None:
-                return commit
-
-    @locked_cached_property
-    def _last_changeset(self):
-        try:
-            ref = self._repo.lookup_reference('refs/heads/master')
-        except Exception:
-            return
-        head = ref.peel()
-        for commit in self._repo.walk(ref.target,
-                                      GIT_SORT_TOPOLOGICAL |
-                                      GIT_SORT_TIME):
-            diff = self._repo.diff(head, commit)
-            for patch in diff:
-                try:
-                    new_file_path = patch.delta.new_file.path
-                except AttributeError:
-                    new_file_path = patch.new_file_path
-                if new_file_path == self._path:
-                    return head
-            head = commit
+    def _history_entry(self):
+        history = self._history
+        if history is None:
+            history = HistoryIndex(self._repo)
+        return history.get(self._path)
 
     @locked_cached_property
     def path(self):
@@ -96,7 +110,7 @@ class FileCtx(_FileCtx):
             if os.path.isfile(real_file):
                 with open(real_file, 'rb') as fp:
                     return fp.read()
-        return self._ctx.data
+        return self._repo[self._oid].data
 
     @locked_cached_property
     def content(self):
@@ -108,29 +122,23 @@ class FileCtx(_FileCtx):
         """Unix timestamp of the creation date of the file (date of the first
         commit).
         """
-        try:
-            date = self._first_changeset.author.time
-        except:
-            date = time.time()
-        return int(date)
+        if self._history_entry is not None:
+            return self._history_entry.date
+        return int(time.time())
 
     @locked_cached_property
     def mdate(self):
         """Unix timestamp of the last modification date of the file (date of
         the most recent commit).
         """
-        if self._last_changeset and \
-           self._last_changeset.oid != self._first_changeset.oid:
-            return int(self._last_changeset.author.time)
+        if self._history_entry is not None:
+            return self._history_entry.mdate
 
     @locked_cached_property
     def author(self):
         """The creator of the file (commiter of the first revision of the
         file)."""
-        if self._first_changeset:
-            name = self._first_changeset.author.name
-            email = self._first_changeset.author.email
-        else:
-            name = self._repo.config['user.name']
-            email = self._repo.config['user.email']
-        return '%s <%s>' % (name, email)
+        if self._history_entry is not None:
+            return self._history_entry.author
+        return '%s <%s>' % (self._repo.config['user.name'],
+                            self._repo.config['user.email'])
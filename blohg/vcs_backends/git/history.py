@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.git.history
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Model with classes to index the history of the files of a Git branch.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+from pygit2 import GIT_FILEMODE_TREE, GIT_SORT_REVERSE, GIT_SORT_TIME, \
+    GIT_SORT_TOPOLOGICAL
+
+from blohg.vcs import HistoryIndex as _HistoryIndex
+
+
+class HistoryIndex(_HistoryIndex):
+    """Index with the first and last commits that touched every file of a
+    branch, built with a single walk of its history.
+
+    Instead of diffing commits, the trees of each commit are compared with the
+    trees of its parents by the oids of their entries, skipping unchanged
+    subtrees entirely.
+    """
+
+    def __init__(self, repo, ref_name='refs/heads/master', cache_file=None):
+        _HistoryIndex.__init__(self, cache_file)
+        self._repo = repo
+        try:
+            ref = self._repo.lookup_reference(ref_name)
+        except Exception:
+            return
+        self.sync(ref.target.hex)
+
+    def _walk(self, tip, since=None):
+        walker = self._repo.walk(tip, GIT_SORT_TOPOLOGICAL | GIT_SORT_TIME |
+                                 GIT_SORT_REVERSE)
+        if since is not None:
+            walker.hide(since)
+        for commit in walker:
+            parents = [parent.tree for parent in commit.parents]
+            yield commit.hex, int(commit.author.time), \
+                '%s <%s>' % (commit.author.name, commit.author.email), \
+                self._changed_paths(commit.tree, parents)
+
+    def _is_ancestor(self, revision, tip):
+        try:
+            return self._repo.merge_base(revision, tip).hex == revision
+        except Exception:
+            return False
+
+    def _changed_paths(self, tree, parents, prefix=''):
+        for entry in tree:
+            path = prefix + entry.name
+            old_entries = []
+            for parent in parents:
+                try:
+                    old_entry = parent[entry.name]
+                except KeyError:
+                    continue
+                if old_entry.oid == entry.oid:
+                    break
+                old_entries.append(old_entry)
+            else:
+                if entry.filemode != GIT_FILEMODE_TREE:
+                    yield path
+                    continue
+                old_trees = [self._repo[i.oid] for i in old_entries
+                             if i.filemode == GIT_FILEMODE_TREE]
+                for i in self._changed_paths(self._repo[entry.oid],
+                                             old_trees, path + '/'):
+                    yield i
@@ -9,14 +9,21 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
+import os
 import time
 from flask.helpers import locked_cached_property
 from mercurial import error, hg, ui
 from zlib import adler32
 
 from blohg.vcs_backends.hg.filectx import FileCtx
-from blohg.vcs_backends.hg.utils import hg2u
-from blohg.vcs import ChangeCtx
+from blohg.vcs_backends.hg.history import FileHistory, HistoryIndex
+from blohg.vcs_backends.hg.utils import hg2u, u2hg
+from blohg.vcs import ChangeCtx, HISTORY_CACHE_FILE, repository_pool, \
+     stat_files, working_dir_state
+
+
+def _open_repo(repo_path):
+    return hg.repository(ui.ui(), repo_path)
 
 
 class ChangeCtxBase(ChangeCtx):
@@ -24,11 +31,24 @@ class ChangeCtxBase(ChangeCtx):
 
     def __init__(self, repo_path):
         self._repo_path = repo_path.encode('utf-8')
-        self._ui = ui.ui()
-        self._repo = hg.repository(self._ui, self._repo_path)
+        # each change context has its own repository handle, that is still
+        # read by the requests after a reload. the pooled handle is only used
+        # to look for new revisions.
+        self._repo = _open_repo(self._repo_path)
+        self._changelog_stat = self._get_changelog_stat()
         self._ctx = self._repo[self.revision_id]
         self.revno = self._ctx.rev()
 
+    def _get_pooled_repo(self):
+        return repository_pool.get('hg', self._repo_path, _open_repo)
+
+    def _get_changelog_stat(self):
+        try:
+            st = os.stat(self._repo.svfs.join(b'00changelog.i'))
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
     @locked_cached_property
     def files(self):
         files = set(self._ctx.manifest().keys())
@@ -41,8 +61,15 @@ class ChangeCtxBase(ChangeCtx):
             rv.append(hg2u(i))
         return rv
 
+    @locked_cached_property
+    def history(self):
+        """Mapping with the creation/modification data of the tracked files.
+        The filelog of each file is read only when the file is looked up.
+        """
+        return FileHistory(self._repo, self._ctx)
+
     def get_filectx(self, path):
-        return FileCtx(self._repo, self._ctx, path)
+        return FileCtx(self._repo, self._ctx, path, history=self.history)
 
 
 class ChangeCtxDefault(ChangeCtxBase):
@@ -55,6 +82,8 @@ class ChangeCtxDefault(ChangeCtxBase):
         ChangeCtxBase.__init__(self, repo_path)
         if self.revno is None:
             raise RuntimeError('No commits found in the repository!')
+        self._tip_stat = self._changelog_stat
+        self._tip_ctx = self._ctx
 
     @property
     def revision_id(self):
@@ -63,10 +92,26 @@ class ChangeCtxDefault(ChangeCtxBase):
         except error.RepoLookupError:
             return None
 
+    @locked_cached_property
+    def history(self):
+        """Index with the creation/modification data of every file, shared by
+        all the file contexts of this change context. It is persisted inside
+        the mercurial cache directory, and updated incrementally when the
+        branch moves.
+        """
+        return HistoryIndex(self._repo, self._ctx.node(), cache_file=\
+                            os.path.join(hg2u(self._repo.path), 'cache',
+                                         HISTORY_CACHE_FILE))
+
     def needs_reload(self):
         if self.revno is None:
             return True
-        repo = hg.repository(self._ui, self._repo_path)
+        # the changelog is append-only, no new revisions can exist if it
+        # wasn't touched.
+        if self._get_changelog_stat() == self._changelog_stat:
+            return False
+        repo = self._get_pooled_repo()
+        repo.invalidate()
         try:
             revision_id = repo.branchtip(b'default')
         except error.RepoLookupError:
@@ -74,13 +119,42 @@ class ChangeCtxDefault(ChangeCtxBase):
         revision = repo[revision_id]
         return revision.rev() > self.revno
 
+    @locked_cached_property
+    def _manifest(self):
+        return self._ctx.manifest()
+
+    def file_id(self, path):
+        """The file node of the file."""
+        return self._manifest.get(u2hg(path))
+
+    def _get_tip_ctx(self):
+        # the tip of the branch is resolved again only if the changelog was
+        # touched since the last call.
+        stat = self._get_changelog_stat()
+        if stat == self._changelog_stat:
+            return self._ctx
+        if stat != self._tip_stat:
+            # the tip context is read by other threads, then it gets its own
+            # handle too.
+            repo = _open_repo(self._repo_path)
+            try:
+                self._tip_ctx = repo[repo.branchtip(b'default')]
+            except error.RepoLookupError:
+                self._tip_ctx = None
+            self._tip_stat = stat
+        return self._tip_ctx
+
     def filectx_needs_reload(self, filectx):
-        filelog = filectx._ctx.filelog()
-        changesets = list(filelog)
-        new_filectx = self.get_filectx(filectx._path)
-        new_filelog = new_filectx._ctx.filelog()
-        new_changesets = list(new_filelog)
-        return len(changesets) != len(new_changesets)
+        """A file context needs a reload if the file node of its file at the
+        tip of the branch isn't the one it was built from.
+        """
+        ctx = self._get_tip_ctx()
+        if ctx is None:
+            return True
+        try:
+            return ctx.filenode(filectx._ctx.path()) != filectx._ctx.filenode()
+        except error.LookupError:
+            return True
 
     def published(self, date, now):
         return date <= now
@@ -100,6 +174,13 @@ class ChangeCtxWorkingDir(ChangeCtxBase):
 
     revision_id = None
 
+    def __init__(self, repo_path):
+        ChangeCtxBase.__init__(self, repo_path)
+        self._root = hg2u(self._repo.root)
+        self._state = working_dir_state(self._root, self.files,
+                                        [os.path.join(hg2u(self._repo.path),
+                                                      'dirstate')])
+
     @property
     def _extra_files(self):
         status = self._repo.status(unknown=True)
@@ -108,11 +189,15 @@ class ChangeCtxWorkingDir(ChangeCtxBase):
         return status.unknown
 
     def needs_reload(self):
-        """This change context is mainly used by the command-line tool, and
-        didn't provides any reliable way to evaluate its "freshness". Always
-        reload.
+        """This change context is mainly used by the command-line tool. Its
+        "freshness" is evaluated by comparing the modification times and sizes
+        of the files, of their directories and of the mercurial dirstate with
+        the ones from when it was created.
         """
-        return True
+        return stat_files(self._root, self._state) != self._state
+
+    def file_id(self, path):
+        return self._state.get(path)
 
     def filectx_needs_reload(self, filectx):
         return True
@@ -19,16 +19,22 @@ from blohg.vcs import FileCtx as _FileCtx
 class FileCtx(_FileCtx):
     """Base class that represents a file context."""
 
-    def __init__(self, repo, changectx, path):
+    def __init__(self, repo, changectx, path, history=None):
         self._repo = repo
         self._changectx = changectx
         self._path = path
+        self._history = history
         self._ctx = self._changectx[u2hg(self._path)]
 
+    @locked_cached_property
+    def _history_entry(self):
+        if self._history is not None:
+            return self._history.get(self._path)
+
     @locked_cached_property
     def _first_changeset(self):
         filelog = self._ctx.filelog()
-        if len(list(filelog)) > 0:
+        if len(filelog) > 0:
             return self._repo[filelog.linkrev(0)]
 
     @locked_cached_property
@@ -51,6 +57,8 @@ class FileCtx(_FileCtx):
         """Unix timestamp of the creation date of the file (date of the first
         commit).
         """
+        if self._history_entry is not None:
+            return self._history_entry.date
         if self._first_changeset:
             return int(self._first_changeset.date()[0])
         return int(time.time())
@@ -60,16 +68,20 @@ class FileCtx(_FileCtx):
         """Unix timestamp of the last modification date of the file (date of
         the most recent commit).
         """
+        if self._history_entry is not None:
+            return self._history_entry.mdate
         filelog = self._ctx.filelog()
-        changesets = list(filelog)
-        if len(changesets) > 1:
-            last_changeset = self._repo[filelog.linkrev(len(changesets) - 1)]
+        count = len(filelog)
+        if count > 1:
+            last_changeset = self._repo[filelog.linkrev(count - 1)]
             return int(last_changeset.date()[0])
 
     @locked_cached_property
     def author(self):
         """The creator of the file (commiter of the first revision of the
         file)."""
+        if self._history_entry is not None:
+            return self._history_entry.author
         if self._first_changeset:
             return hg2u(self._first_changeset.user())
         try:
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.hg.history
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Model with classes to index the history of the files of a Mercurial
+    branch.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+from mercurial.node import bin, hex
+
+from blohg.vcs_backends.hg.utils import hg2u, u2hg
+from blohg.vcs import HistoryEntry, HistoryIndex as _HistoryIndex
+
+
+class FileHistory(object):
+    """Mapping with the creation/modification data of the files of a change
+    context, built from the first and the last revisions of the filelog of
+    each file, only when the file is first looked up. The date and the user
+    of each changeset are read only once.
+    """
+
+    def __init__(self, repo, ctx):
+        self._repo = repo
+        self._ctx = ctx
+        self._changesets = {}
+        self._entries = {}
+
+    def _get_changeset(self, rev):
+        if rev not in self._changesets:
+            ctx = self._repo[rev]
+            self._changesets[rev] = int(ctx.date()[0]), hg2u(ctx.user())
+        return self._changesets[rev]
+
+    def get(self, path, default=None):
+        if path not in self._entries:
+            filelog = self._repo.file(u2hg(path))
+            count = len(filelog)
+            if count == 0:
+                return default
+            first, last = filelog.linkrev(0), filelog.linkrev(count - 1)
+            date, author = self._get_changeset(first)
+            self._entries[path] = HistoryEntry(
+                first, date, author, last, self._get_changeset(last)[0])
+        return self._entries[path]
+
+    def __getitem__(self, path):
+        rv = self.get(path)
+        if rv is None:
+            raise KeyError(path)
+        return rv
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def keys(self):
+        return [hg2u(i) for i in self._ctx.manifest().keys()
+                if self.get(hg2u(i)) is not None]
+
+
+class HistoryIndex(_HistoryIndex):
+    """Index with the first and last changesets that touched every file of a
+    branch, built with a single pass over the changelog, using the list of
+    files stored in each changeset.
+    """
+
+    def __init__(self, repo, tip, cache_file=None):
+        _HistoryIndex.__init__(self, cache_file)
+        self._repo = repo
+        if tip is not None:
+            self.sync(hex(tip).decode('ascii'))
+
+    def _walk(self, tip, since=None):
+        changelog = self._repo.changelog
+        tiprev = changelog.rev(bin(tip))
+        if since is None:
+            revs = sorted(changelog.ancestors([tiprev], inclusive=True))
+        else:
+            revs = changelog.findmissingrevs([changelog.rev(bin(since))],
+                                             [tiprev])
+        for rev in revs:
+            ctx = self._repo[rev]
+            yield hex(ctx.node()).decode('ascii'), int(ctx.date()[0]), \
+                hg2u(ctx.user()), [hg2u(i) for i in ctx.files()]
+
+    def _is_ancestor(self, revision, tip):
+        changelog = self._repo.changelog
+        if not changelog.hasnode(bin(revision)):
+            return False
+        return changelog.isancestor(bin(revision), bin(tip))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.snapshot
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Package with all the classes and functions needed to serve a snapshot of a
+    blohg repository, written by ``blohg snapshot``. Snapshots are read-only
+    and don't need any VCS.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import os
+
+from blohg.vcs_backends.snapshot.archive import SNAPSHOT_FILE
+from blohg.vcs_backends.snapshot.changectx import ChangeCtxDefault, \
+     ChangeCtxWorkingDir
+from blohg.vcs import Repository, REVISION_DEFAULT, REVISION_WORKING_DIR
+
+
+class SnapshotRepository(Repository):
+    """Main entrypoint for the snapshot layer. This class offers abstract
+    access to everything needed by blohg from a snapshot file.
+    """
+
+    identifier = 'snapshot'
+    name = 'snapshot'
+    order = 15
+    creatable = False
+
+    def get_changectx(self, revision=REVISION_DEFAULT):
+        """Method that returns a change context for a given Revision state.
+
+        Both revision states read the same snapshot file, but the working_dir
+        state publishes all the posts, like the other backends.
+        """
+        if revision == REVISION_DEFAULT:
+            return ChangeCtxDefault(self.path)
+        elif revision == REVISION_WORKING_DIR:
+            return ChangeCtxWorkingDir(self.path)
+        raise RuntimeError('Invalid repository revision: %r' % revision)
+
+    @staticmethod
+    def create_repo(repo_path):
+        raise RuntimeError('snapshots should be created with the "blohg '
+                           'snapshot" command')
+
+    @staticmethod
+    def supported(repo_path):
+        return os.path.isfile(os.path.join(repo_path, SNAPSHOT_FILE))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.snapshot.archive
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Module with the functions to write and read snapshot files.
+
+    A snapshot file is composed by a header (magic string and the length of
+    the index), a JSON index and the data of the files, concatenated::
+
+        MAGIC | index length (8 bytes, big-endian) | index | data
+
+    The index is a dictionary with the revision id of the change context and a
+    list with the ``[path, offset, size, sha1, date, mdate, author]`` of every
+    file, sorted by path. Offsets are relative to the beginning of the data.
+    Files with the same content share the same data.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import binascii
+import hashlib
+import json
+import os
+import struct
+
+MAGIC = b'BLOHGSS1'
+
+# default name of the snapshot file, inside the directory served by blohg.
+SNAPSHOT_FILE = 'blohg.snapshot'
+
+_header = struct.Struct('>8sQ')
+
+
+def write_snapshot(changectx, filename):
+    """Writes a snapshot of the given change context to ``filename``. The file
+    is replaced atomically, then the processes serving the previous snapshot
+    can keep using it until they reload.
+    """
+    files = []
+    blobs = []
+    offsets = {}
+    offset = 0
+    for path in changectx.files:
+        filectx = changectx.get_filectx(path)
+        data = filectx.data
+        sha1 = hashlib.sha1(data).hexdigest()
+        if sha1 not in offsets:
+            offsets[sha1] = offset
+            blobs.append(data)
+            offset += len(data)
+        files.append([path, offsets[sha1], len(data), sha1, filectx.date,
+                      filectx.mdate, filectx.author])
+    revision_id = changectx.revision_id
+    if isinstance(revision_id, bytes):
+        revision_id = binascii.hexlify(revision_id).decode('ascii')
+    elif revision_id is not None:
+        revision_id = str(revision_id)
+    index = json.dumps({'revision_id': revision_id,
+                        'files': files}).encode('utf-8')
+    tmp_filename = '%s.%i.tmp' % (filename, os.getpid())
+    try:
+        with open(tmp_filename, 'wb') as fp:
+            fp.write(_header.pack(MAGIC, len(index)))
+            fp.write(index)
+            for data in blobs:
+                fp.write(data)
+        os.replace(tmp_filename, filename)
+    except:
+        try:
+            os.unlink(tmp_filename)
+        except OSError:
+            pass
+        raise
+
+
+def read_index(buf):
+    """Returns a tuple with the index and the offset of the data of the
+    snapshot stored in the given buffer.
+    """
+    try:
+        magic, length = _header.unpack_from(buf)
+    except struct.error:
+        magic = None
+    if magic != MAGIC:
+        raise RuntimeError('Invalid snapshot file')
+    start = _header.size + length
+    return json.loads(bytes(buf[_header.size:start]).decode('utf-8')), start
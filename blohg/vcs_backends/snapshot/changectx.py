@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.snapshot.changectx
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Model with classes to represent snapshot change context.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+import mmap
+import os
+import time
+from flask.helpers import locked_cached_property
+from zlib import adler32
+
+from blohg.vcs_backends.snapshot.archive import read_index, SNAPSHOT_FILE
+from blohg.vcs_backends.snapshot.filectx import FileCtx
+from blohg.vcs import ChangeCtx
+
+
+class ChangeCtxDefault(ChangeCtx):
+    """Class with the specific implementation details for the change context
+    of a snapshot file. The file is memory-mapped, then its pages are shared
+    by all the processes serving it, through the page cache of the operating
+    system.
+    """
+
+    def __init__(self, repo_path):
+        self._filename = os.path.join(repo_path, SNAPSHOT_FILE)
+        try:
+            with open(self._filename, 'rb') as fp:
+                self._stat = self._get_stat(fp.fileno())
+                self._buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as err:
+            raise RuntimeError('Failed to open snapshot: %s' % err)
+        index, start = read_index(self._buf)
+        self._revision_id = index['revision_id']
+        self._entries = {}
+        for path, offset, size, sha1, date, mdate, author in index['files']:
+            self._entries[path] = (start + offset, size, sha1, date, mdate,
+                                   author)
+
+    @staticmethod
+    def _get_stat(fd_or_path):
+        st = os.stat(fd_or_path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    @property
+    def revision_id(self):
+        return self._revision_id
+
+    @locked_cached_property
+    def files(self):
+        return sorted(self._entries)
+
+    def needs_reload(self):
+        # snapshots are replaced atomically, a new file means a new inode.
+        try:
+            return self._get_stat(self._filename) != self._stat
+        except OSError:
+            return False
+
+    def filectx_needs_reload(self, filectx):
+        """A file context needs a reload if this change context needs one,
+        or if it was built from an older change context, with another version
+        of the file.
+        """
+        if self.needs_reload():
+            return True
+        changectx = filectx._changectx
+        return changectx is not self and \
+            changectx.file_id(filectx.path) != self.file_id(filectx.path)
+
+    def published(self, date, now):
+        return date <= now
+
+    def file_id(self, path):
+        entry = self._entries.get(path)
+        if entry is not None:
+            return entry[2]
+
+    def get_filectx(self, path):
+        return FileCtx(self._buf, self, path, entry=self._entries.get(path))
+
+    def get_contents(self, paths):
+        rv = {}
+        for path in paths:
+            offset, size = self._entries[path][:2]
+            rv[path] = self._buf[offset:offset + size].decode('utf-8')
+        return rv
+
+    def etag(self, filectx):
+        return 'blohg-%i-%i-%s' % (filectx.mdate or filectx.date,
+                                   len(filectx.data),
+                                   adler32(filectx.path.encode('utf-8'))
+                                   & 0xffffffff)
+
+
+class ChangeCtxWorkingDir(ChangeCtxDefault):
+    """Class with the specific implementation details for the change context
+    of a snapshot file, used by the command-line tool. All the files are
+    published.
+    """
+
+    def filectx_needs_reload(self, filectx):
+        return True
+
+    def published(self, date, now):
+        return True
+
+    def etag(self, filectx):
+        return 'blohg-%i-%i-%s' % (time.time(), len(filectx.data),
+                                   adler32(filectx.path.encode('utf-8'))
+                                   & 0xffffffff)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+    blohg.vcs_backends.snapshot.filectx
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Model with classes to represent snapshot file context.
+
+    :copyright: (c) 2010-2013 by Rafael Goncalves Martins
+    :license: GPL-2, see LICENSE for more details.
+"""
+
+from flask.helpers import locked_cached_property
+
+from blohg.vcs import FileCtx as _FileCtx
+
+
+class FileCtx(_FileCtx):
+    """Base class that represents a file context."""
+
+    def __init__(self, buf, changectx, path, entry=None):
+        self._buf = buf
+        self._changectx = changectx
+        self._path = path
+        if entry is None:
+            raise RuntimeError('Invalid file: %s' % self._path)
+        self._offset, self._size, self._sha1, self._date, self._mdate, \
+            self._author = entry
+
+    @locked_cached_property
+    def path(self):
+        """UTF-8 encoded file path, relative to the repository root."""
+        return self._path
+
+    @locked_cached_property
+    def data(self):
+        """Raw data of the file."""
+        return self._buf[self._offset:self._offset + self._size]
+
+    @locked_cached_property
+    def content(self):
+        """UTF-8 encoded content of the file."""
+        return self.data.decode('utf-8')
+
+    @locked_cached_property
+    def date(self):
+        """Unix timestamp of the creation date of the file."""
+        return self._date
+
+    @locked_cached_property
+    def mdate(self):
+        """Unix timestamp of the last modification date of the file."""
+        return self._mdate
+
+    @locked_cached_property
+    def author(self):
+        """The creator of the file."""
+        return self._author
@@ -9,10 +9,8 @@
     :license: GPL-2, see LICENSE for more details.
 """
 
-import math
-
 from flask import Blueprint, abort, current_app, make_response, \
-     render_template, url_for, redirect
+     render_template, request, url_for, redirect
 from feedgenerator.django.utils import feedgenerator
 from jinja2 import TemplateNotFound
 from werkzeug.exceptions import NotFound
@@ -33,12 +31,11 @@ def atom(tag=None):
     if tag is not None:
         tags = tag.split('/')
         for _tag in tags:
-            if _tag not in current_app.blohg.content.tags:
+            if _tag not in current_app.blohg.content.tag_set:
                 abort(404)
         title += ' » %s' % ' + '.join(tags)
-        posts = current_app.blohg.content.get_by_tag(tags)
     else:
-        posts = current_app.blohg.content.get_all(True)
+        tags = None
     feed = feedgenerator.Atom1Feed(title=title,
                                    link=url_for('views.home', _external=True),
                                    description=current_app.config['TAGLINE'],
@@ -49,7 +46,9 @@ def atom(tag=None):
     posts_per_atom_feed = \
         current_app.config.get('POSTS_PER_ATOM_FEED',
                                current_app.config.get('POSTS_PER_PAGE'))
-    for post in posts[:int(posts_per_atom_feed)]:
+    posts = current_app.blohg.content.get_page(1, int(posts_per_atom_feed),
+                                               tag=tags)[0]
+    for post in posts:
         feed.add_item(title=post.title, content=post.full_raw_html,
                       description=post.abstract_raw_html,
                       unique_id=url_for('views.content', slug=post.slug),
@@ -89,14 +88,9 @@ def home(page=None):
             return content('')
         except NotFound:
             page = 1
-    current = int(page)
-    pages = current_app.blohg.content.get_all(True)
-    ppp = int(current_app.config['POSTS_PER_PAGE'])
-    num_pages = int(math.ceil(float(len(pages)) / ppp))
-    init = int((current - 1) * ppp)
-    end = int(current * ppp)
+    posts, num_pages = current_app.blohg.content.get_page(
+        int(page), int(current_app.config['POSTS_PER_PAGE']))
     url_gen = lambda x: url_for('views.home', page=x)
-    posts = pages[init:end]
     return render_template('_posts.html', posts=posts, full_content=False,
                            pagination={'num_pages': num_pages, 'current': page,
                                        'url_gen': url_gen})
@@ -130,18 +124,13 @@ def tag(tag, page=None):
     """
     tags = tag.split('/')
     for _tag in tags:
-        if _tag not in current_app.blohg.content.tags:
+        if _tag not in current_app.blohg.content.tag_set:
             abort(404)
     if page is None:
         page = 1
-    current = int(page)
-    pages = current_app.blohg.content.get_by_tag(tags)
-    ppp = int(current_app.config['POSTS_PER_PAGE'])
-    num_pages = int(math.ceil(float(len(pages)) / ppp))
-    init = int((current - 1) * ppp)
-    end = int(current * ppp)
+    posts, num_pages = current_app.blohg.content.get_page(
+        int(page), int(current_app.config['POSTS_PER_PAGE']), tag=tags)
     url_gen = lambda x: url_for('views.tag', tag=tag, page=x)
-    posts = pages[init:end]
     if len(posts) == 0:
         abort(404)
     return render_template('_posts.html', title='Tag: %s' % ' + '.join(tags),
@@ -150,6 +139,54 @@ def tag(tag, page=None):
                                        'url_gen': url_gen})
 
 
+@views.route('/archive/<int:year>/')
+@views.route('/archive/<int:year>/page/<int:page>/')
+@views.route('/archive/<int:year>/<int:month>/')
+@views.route('/archive/<int:year>/<int:month>/page/<int:page>/')
+def archive(year, month=None, page=None):
+    """Page that lists the abstract of all available posts for the given
+    year, or year and month. It uses pagination, like the home.
+    """
+    if month is not None and not 1 <= month <= 12:
+        abort(404)
+    if page is None:
+        page = 1
+    period = year if month is None else (year, month)
+    posts, num_pages = current_app.blohg.content.get_page(
+        int(page), int(current_app.config['POSTS_PER_PAGE']),
+        archive=period)
+    url_gen = lambda x: url_for('views.archive', year=year, month=month,
+                                page=x)
+    if len(posts) == 0:
+        abort(404)
+    title = 'Archive: %04i' % year
+    if month is not None:
+        title += '-%02i' % month
+    return render_template('_posts.html', title=title, posts=posts,
+                           full_content=False,
+                           pagination={'num_pages': num_pages, 'current': page,
+                                       'url_gen': url_gen})
+
+
+@views.route('/search/')
+def search():
+    """Page that lists the abstract of the posts that match the query given
+    in the ``q`` argument, the most relevant first. It uses pagination, like
+    the home, with the page given in the ``page`` argument.
+    """
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    posts = query and current_app.blohg.content.search(query) or []
+    ppp = int(current_app.config['POSTS_PER_PAGE'])
+    num_pages = (len(posts) + ppp - 1) // ppp
+    url_gen = lambda x: url_for('views.search', q=query, page=x)
+    posts = posts[(page - 1) * ppp:page * ppp] if page > 0 else []
+    return render_template('_posts.html', title='Search: %s' % query,
+                           posts=posts, full_content=False,
+                           pagination={'num_pages': num_pages, 'current': page,
+                                       'url_gen': url_gen})
+
+
 @views.route('/source/')  # just to make robots.txt's url_for happy :)
 @views.route('/source/<path:slug>/')
 def source(slug=None):